@@ -3,9 +3,25 @@ Aplicación Streamlit para comparar SQL vs NoSQL
 Demostración de diferencias de rendimiento
 """
 import streamlit as st
-import psycopg2
-from pymongo import MongoClient
-import time
+import busquedas
+from busquedas import (
+    IS_CLOUD,
+    SQL_MODO_INDIVIDUAL, SQL_MODO_LOTES, SQL_MODO_PIPELINE, SQL_BATCH_SIZE,
+    SQL_COINCIDENCIA_EXACTA, SQL_FILTROS,
+    NOSQL_MODO_INDIVIDUAL, NOSQL_MODO_LOTES, NOSQL_CHUNK_SIZE, NOSQL_CURSOR_BATCH_SIZE,
+    SEARCH_CONCURRENCY,
+    get_postgres_index_stats, postgres_has_summary_table, mongo_has_full_name_index,
+    explain_student_sql, explain_student_nosql, muestra_estudiantes,
+    PLAN_CACHE_MODES, get_prepared_statement_stats, postgres_binario_disponible,
+    search_student_sql, search_students_sql_batch, search_students_sql_pipeline,
+    search_student_nosql, search_students_nosql_batch,
+    ETAPAS, run_searches, resumen_latencias, histograma,
+)
+from motores_async import (
+    ASYNC_INFLIGHT, postgres_async_disponible, mongo_async_disponible, run_searches_async,
+    search_student_sql_async, search_students_sql_batch_async,
+    search_student_nosql_async, search_students_nosql_batch_async,
+)
 #import pandas as pd # pandas no es necesario aquí (se eliminó uso)
 
 # Configuración de página
@@ -15,239 +31,98 @@ st.set_page_config(
     layout="wide"
 )
 
-# Configuración de bases de datos
-import os
-
-# Detectar si estamos en Streamlit Cloud
-IS_CLOUD = os.getenv('STREAMLIT_SHARING_MODE') is not None or os.getenv('STREAMLIT_CLOUD') is not None
-
-PG_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'user': 'postgres',
-    'password': 'postgres',
-    'database': 'universidad_db'
-}
-
-# MongoDB: usar Atlas si está en la nube, local si no
-if IS_CLOUD:
-    # Conexión a MongoDB Atlas (nube)
-    MONGO_URI = os.getenv('MONGO_URI', 'mongodb+srv://cluster0.mongodb.net/')
-    MONGO_CONFIG = {
-        'uri': MONGO_URI,
-        'database': 'universidad_db'
-    }
-else:
-    # Conexión local
-    MONGO_CONFIG = {
-        'host': 'localhost',
-        'port': 27017,
-        'database': 'universidad_db'
-    }
-
-# Cache de conexiones
-@st.cache_resource
-def get_postgres_connection():
-    """Obtiene conexión a PostgreSQL"""
-    # Si estamos en la nube, no intentar conectar
-    if IS_CLOUD:
-        return None
-
-    try:
-        conn = psycopg2.connect(**PG_CONFIG)
-        return conn
-    except Exception as e:
-        st.error(f"Error conectando a PostgreSQL: {e}")
-        return None
+# Conexiones (la lógica de conexión y búsqueda vive en busquedas.py, que guarda las
+# conexiones abiertas). Sin st.cache_resource: un fallo no se cachea y busquedas.py
+# reintenta con espera en los siguientes reruns.
+def get_postgres_pool():
+    """Obtiene el pool de conexiones a PostgreSQL"""
+    pool = busquedas.get_postgres_pool()
+    if pool is None and busquedas.connection_error('postgres'):
+        st.error(f"Error conectando a PostgreSQL: {busquedas.connection_error('postgres')}")
+    return pool
 
-@st.cache_resource
 def get_mongo_connection():
     """Obtiene conexión a MongoDB"""
-    try:
-        if IS_CLOUD and 'uri' in MONGO_CONFIG:
-            # Conexión a MongoDB Atlas
-            client = MongoClient(MONGO_CONFIG['uri'])
-        else:
-            # Conexión local
-            client = MongoClient(MONGO_CONFIG['host'], MONGO_CONFIG['port'])
-
-        db = client[MONGO_CONFIG['database']]
-        # Verificar conexión
-        db.list_collection_names()
-        return db
-    except Exception as e:
-        st.error(f"Error conectando a MongoDB: {e}")
-        return None
+    db = busquedas.get_mongo_connection()
+    if db is None and busquedas.connection_error('mongo'):
+        st.error(f"Error conectando a MongoDB: {busquedas.connection_error('mongo')}")
+    return db
 
 def get_all_students_postgres():
-    """Obtiene lista de TODOS los estudiantes de PostgreSQL ordenados alfabéticamente"""
-    conn = get_postgres_connection()
-    if not conn:
-        # Si PostgreSQL no está disponible, usar MongoDB
-        return get_all_students_mongo()
-
-    try:
-        cursor = conn.cursor()
-        # Traer TODOS los estudiantes ordenados alfabéticamente para el combobox
-        cursor.execute("SELECT nombre, apellido FROM estudiantes ORDER BY apellido, nombre")
-        students = [f"{row[0]} {row[1]}" for row in cursor.fetchall()]
-        cursor.close()
-        return students
-    except Exception as e:
-        # Si hay error (ej: tabla no existe), usar MongoDB
-        return get_all_students_mongo()
-
-def get_all_students_mongo():
-    """Obtiene lista de TODOS los estudiantes de MongoDB ordenados alfabéticamente"""
-    db = get_mongo_connection()
-    if not db:
-        return []
-
+    """Obtiene lista de TODOS los estudiantes (PostgreSQL, o MongoDB si no está disponible)"""
     try:
-        # Obtener todos los estudiantes y ordenar
-        students = db.estudiantes.find({}, {'nombre': 1, 'apellido': 1}).sort([('apellido', 1), ('nombre', 1)])
-        return [f"{s['nombre']} {s['apellido']}" for s in students]
+        return busquedas.get_all_students_postgres()
     except Exception as e:
         st.error(f"Error obteniendo estudiantes: {e}")
         return []
 
-def search_student_sql(student_name):
-    """Busca un estudiante en PostgreSQL con múltiples JOINs"""
-    conn = get_postgres_connection()
-    if not conn:
-        return None, 0
-
-    start_time = time.time()
-
-    cursor = conn.cursor()
-
-    # Query compleja con múltiples JOINs - búsqueda por nombre completo (más lenta, realista)
-    query = """
-    SELECT 
-        e.id,
-        e.nombre,
-        e.apellido,
-        e.email,
-        e.edad,
-        e.carrera,
-        e.año_ingreso,
-        e.promedio,
-        u.nombre as universidad,
-        u.ciudad as ciudad_universidad,
-        p_uni.nombre as pais_universidad,
-        p_ori.nombre as pais_origen,
-        p_ori.codigo as codigo_pais,
-        COUNT(m.id) as total_cursos,
-        AVG(m.nota) as promedio_cursos,
-        SUM(m.creditos) as total_creditos
-    FROM estudiantes e
-    JOIN universidades u ON e.universidad_id = u.id
-    JOIN paises p_uni ON u.pais_id = p_uni.id
-    JOIN paises p_ori ON e.pais_origen_id = p_ori.id
-    LEFT JOIN matriculas m ON e.id = m.estudiante_id
-    WHERE CONCAT(e.nombre, ' ', e.apellido) ILIKE %s
-    GROUP BY e.id, e.nombre, e.apellido, e.email, e.edad, e.carrera, 
-             e.año_ingreso, e.promedio, u.nombre, u.ciudad, 
-             p_uni.nombre, p_ori.nombre, p_ori.codigo
-    LIMIT 1
-    """
-
-    # Buscar por nombre completo (LIKE) - esto hace que SQL sea más lento debido a los JOINs
-    cursor.execute(query, (f"%{student_name}%",))
-    result = cursor.fetchone()
-
-    # Obtener cursos detallados
-    courses = []
-    if result:
-        cursor.execute("""
-            SELECT curso, semestre, nota, creditos
-            FROM matriculas
-            WHERE estudiante_id = %s
-            ORDER BY semestre, curso
-        """, (result[0],))
-        courses = cursor.fetchall()
-
-    cursor.close()
-
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-
-    if result:
-        data = {
-            'id': result[0],
-            'nombre': result[1],
-            'apellido': result[2],
-            'email': result[3],
-            'edad': result[4],
-            'carrera': result[5],
-            'año_ingreso': result[6],
-            'promedio': float(result[7]),
-            'universidad': result[8],
-            'ciudad_universidad': result[9],
-            'pais_universidad': result[10],
-            'pais_origen': result[11],
-            'codigo_pais': result[12],
-            'total_cursos': result[13],
-            'promedio_cursos': float(result[14]) if result[14] else 0,
-            'total_creditos': result[15] if result[15] else 0,
-            'cursos': [
-                {
-                    'curso': c[0],
-                    'semestre': c[1],
-                    'nota': float(c[2]),
-                    'creditos': c[3]
-                } for c in courses
-            ]
-        }
-        return data, elapsed_time
-
-    return None, elapsed_time
-
-def search_student_nosql(student_name):
-    """Busca un estudiante en MongoDB - Optimizado con índices"""
-    db = get_mongo_connection()
-    if db is None:
-        return None, 0
-
-    start_time = time.time()
-
-    # Buscar concatenando nombre y apellido como lo hace PostgreSQL
-    # Esto maneja correctamente nombres compuestos como "Jose Miguel" o "María Dolores"
-    result = db.estudiantes.find_one({
-        '$expr': {
-            '$eq': [
-                {'$concat': ['$nombre', ' ', '$apellido']},
-                student_name.strip()
-            ]
-        }
-    })
-
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-
-    if result:
-        data = {
-            'id': result['id'],
-            'nombre': result['nombre'],
-            'apellido': result['apellido'],
-            'email': result['email'],
-            'edad': result['edad'],
-            'carrera': result['carrera'],
-            'año_ingreso': result['año_ingreso'],
-            'promedio': result['promedio'],
-            'universidad': result['universidad']['nombre'],
-            'ciudad_universidad': result['universidad']['ciudad'],
-            'pais_universidad': result['universidad']['pais']['nombre'],
-            'pais_origen': result['pais_origen']['nombre'],
-            'codigo_pais': result['pais_origen']['codigo'],
-            'total_cursos': len(result['matriculas']),
-            'promedio_cursos': sum(m['nota'] for m in result['matriculas']) / len(result['matriculas']) if result['matriculas'] else 0,
-            'total_creditos': sum(m['creditos'] for m in result['matriculas']),
-            'cursos': result['matriculas']
-        }
-        return data, elapsed_time
-
-    return None, elapsed_time
+def mostrar_distribucion_latencias(latencias, terminaciones, unidad="búsqueda"):
+    """Percentiles, histograma y latencia a lo largo de la corrida (las muestras y el
+    momento en que terminó cada llamada ya vienen de run_searches)"""
+    if not latencias:
+        return
+
+    stats = resumen_latencias(latencias)
+    with st.expander(f"Distribución de latencias por {unidad} ({stats['n']} muestras)"):
+        col_p1, col_p2, col_p3, col_p4 = st.columns(4)
+        with col_p1:
+            st.metric("p50", f"{stats['p50'] * 1000:.2f} ms")
+        with col_p2:
+            st.metric("p95", f"{stats['p95'] * 1000:.2f} ms")
+        with col_p3:
+            st.metric("p99", f"{stats['p99'] * 1000:.2f} ms")
+        with col_p4:
+            st.metric("Máximo", f"{stats['max'] * 1000:.2f} ms")
+
+        st.caption("Histograma (ms)")
+        bins = histograma([l * 1000 for l in latencias], bins=min(30, max(1, len(latencias))))
+        st.bar_chart(
+            {'Latencia (ms)': [round(inicio, 3) for inicio, _ in bins], 'Cantidad': [c for _, c in bins]},
+            x='Latencia (ms)',
+            y='Cantidad'
+        )
+
+        # Contra el momento en que terminó: con concurrencia el orden de la selección no es el temporal
+        st.caption(f"Latencia de cada {unidad} según cuándo terminó (segundos desde el inicio de la corrida)")
+        st.scatter_chart(
+            {'Terminó (s)': terminaciones, 'Latencia (ms)': [l * 1000 for l in latencias]},
+            x='Terminó (s)',
+            y='Latencia (ms)'
+        )
+
+# Nombres de las etapas para mostrar
+ETIQUETAS_ETAPAS = {
+    'conexion': "Conexión (pool)",
+    'ejecutar': "Enviar / ejecutar",
+    'leer': "Leer resultados",
+    'decodificar': "Decodificar",
+    'transformar': "Armar diccionario",
+}
+
+def mostrar_etapas(etapas):
+    """Desglose del tiempo por etapa y CPU del cliente frente al tiempo total"""
+    if not etapas or not etapas.get('total'):
+        return
+
+    total = etapas['total']
+    with st.expander("Tiempo por etapa"):
+        st.bar_chart({
+            'Etapa': [ETIQUETAS_ETAPAS[e] for e in ETAPAS],
+            'Tiempo (ms)': [etapas.get(e, 0.0) * 1000 for e in ETAPAS],
+        }, x='Etapa', y='Tiempo (ms)')
+        st.markdown("\n".join(
+            f"- **{ETIQUETAS_ETAPAS[e]}**: {etapas.get(e, 0.0):.4f}s ({etapas.get(e, 0.0) / total:.0%})"
+            for e in ETAPAS
+        ))
+
+        st.caption("Costo de decodificar en el cliente: en PostgreSQL el driver convierte los tipos al leer las filas (texto o binario); en MongoDB es la decodificación BSON, que con lectura perezosa se hace al armar el diccionario y solo para los campos que se leen.")
+
+        cpu = etapas.get('cpu', 0.0)
+        col_cpu1, col_cpu2 = st.columns(2)
+        with col_cpu1:
+            st.metric("CPU del cliente", f"{cpu:.4f}s", help="Tiempo de CPU de los hilos que ejecutaron las búsquedas (time.thread_time)")
+        with col_cpu2:
+            st.metric("CPU / tiempo", f"{cpu / total:.0%}", help="Cerca de 100%: el cuello de botella es el cliente Python, no la base de datos")
 
 # Interfaz de usuario
 st.title("Comparación de Rendimiento: SQL vs NoSQL")
@@ -264,11 +139,25 @@ if 'sql_results' not in st.session_state:
     st.session_state.sql_results = None
     st.session_state.sql_time = 0
     st.session_state.sql_count = 0
+    st.session_state.sql_batch_times = None
+    st.session_state.sql_latencies = None
+    st.session_state.sql_completions = None
+    st.session_state.sql_wall_time = 0
+    st.session_state.sql_concurrency = 1
+    st.session_state.sql_motor = None
+    st.session_state.sql_etapas = None
 
 if 'nosql_results' not in st.session_state:
     st.session_state.nosql_results = None
     st.session_state.nosql_time = 0
     st.session_state.nosql_count = 0
+    st.session_state.nosql_batch_times = None
+    st.session_state.nosql_latencies = None
+    st.session_state.nosql_completions = None
+    st.session_state.nosql_wall_time = 0
+    st.session_state.nosql_concurrency = 1
+    st.session_state.nosql_motor = None
+    st.session_state.nosql_etapas = None
 
 # Obtener lista de estudiantes y mantenerla estable en session_state para evitar que cambie en cada rerun
 if 'students_list' not in st.session_state or not st.session_state.get('students_list'):
@@ -285,6 +174,32 @@ num_searches = st.slider(
     help="Busca múltiples estudiantes para ver una diferencia de tiempo más evidente. Cuantos más, mayor será la diferencia entre SQL y NoSQL."
 )
 
+# Motor de ejecución: hilos con drivers bloqueantes o asyncio con drivers asíncronos
+MOTOR_HILOS = "Hilos (psycopg2 / pymongo)"
+MOTOR_ASYNC = "asyncio (asyncpg / MongoDB async)"
+motor_ejecucion = st.radio(
+    "Motor de ejecución:",
+    [MOTOR_HILOS, MOTOR_ASYNC],
+    key="motor_ejecucion",
+    horizontal=True,
+    help="Con asyncio un solo hilo mantiene varias consultas en vuelo a la vez y solapa la espera de red de todas ellas."
+)
+usar_async = motor_ejecucion == MOTOR_ASYNC
+
+# Búsquedas en paralelo (en ambas columnas): hilos, o consultas en vuelo con asyncio
+search_concurrency = st.slider(
+    "Consultas en vuelo (asyncio):" if usar_async else "Concurrencia (búsquedas en paralelo):",
+    min_value=1,
+    max_value=256 if usar_async else 64,
+    value=ASYNC_INFLIGHT if usar_async else SEARCH_CONCURRENCY,
+    key="search_concurrency_async" if usar_async else "search_concurrency",
+    help=("Máximo de consultas lanzadas y aún sin respuesta. Las conexiones a PostgreSQL siguen limitadas por PG_POOL_MAX; las consultas de más esperan una conexión libre."
+          if usar_async else
+          "Cantidad de hilos que lanzan búsquedas a la vez. Con 1 las búsquedas van una tras otra; con más se mide cómo escala cada motor bajo carga paralela. En SQL conviene no superar el tamaño máximo del pool (PG_POOL_MAX).")
+)
+if usar_async and not (postgres_async_disponible() and mongo_async_disponible()):
+    st.caption("Falta algún driver asyncio (`pip install asyncpg` / `pymongo>=4.9` o `motor`): esa columna usará el motor de hilos.")
+
 # Selector múltiple de estudiantes
 st.markdown(f"**Selecciona los estudiantes a buscar:** (Puedes agregar más clickeando en el campo)")
 
@@ -327,9 +242,19 @@ with col_clear2:
         st.session_state.sql_results = None
         st.session_state.sql_time = 0
         st.session_state.sql_count = 0
+        st.session_state.sql_batch_times = None
+        st.session_state.sql_latencies = None
+        st.session_state.sql_completions = None
+        st.session_state.sql_wall_time = 0
         st.session_state.nosql_results = None
         st.session_state.nosql_time = 0
         st.session_state.nosql_count = 0
+        st.session_state.nosql_batch_times = None
+        st.session_state.nosql_latencies = None
+        st.session_state.nosql_completions = None
+        st.session_state.nosql_wall_time = 0
+        st.session_state.sql_etapas = None
+        st.session_state.nosql_etapas = None
         # Resetear contadores de paginación
         st.session_state.sql_show_count = 20
         st.session_state.nosql_show_count = 20
@@ -346,8 +271,8 @@ with col1:
     st.markdown("**Base de datos relacional con múltiples tablas**")
 
     # Verificar si PostgreSQL está disponible
-    pg_conn = get_postgres_connection()
-    if pg_conn is None:
+    pg_pool = get_postgres_pool()
+    if pg_pool is None:
         if IS_CLOUD:
             st.warning("""
             ⚠️ **PostgreSQL no disponible en esta demo en línea**
@@ -366,6 +291,71 @@ with col1:
     else:
         st.info(f"Buscando {len(selected_students)} estudiante(s)")
 
+        # Modo de búsqueda: una consulta por nombre, lotes set-based o pipeline (requiere psycopg 3)
+        sql_search_mode = st.radio(
+            "Modo de búsqueda SQL:",
+            [SQL_MODO_INDIVIDUAL, SQL_MODO_LOTES] + ([SQL_MODO_PIPELINE] if postgres_binario_disponible() else []),
+            key="sql_search_mode",
+            horizontal=True,
+            help="Por lotes resuelve cada lote con dos consultas (resumen + matrículas) en vez de dos por estudiante. Pipeline mantiene una consulta por estudiante pero envía todas las del lote sin esperar cada respuesta: la diferencia con la búsqueda individual es la latencia de red, no trabajo del servidor."
+        )
+        sql_batch_size = SQL_BATCH_SIZE
+        sql_coincidencia = SQL_COINCIDENCIA_EXACTA
+        if sql_search_mode != SQL_MODO_LOTES:
+            sql_coincidencia = st.radio(
+                "Coincidencia por nombre:",
+                list(SQL_FILTROS),
+                key="sql_coincidencia",
+                horizontal=True,
+                help="Subcadena (ILIKE) recorre toda la tabla; Subcadena (trigramas) usa el índice GIN de pg_trgm; Exacta usa el índice de expresión sobre LOWER(nombre || ' ' || apellido)."
+            )
+        sql_una_consulta = st.checkbox(
+            "Una sola consulta (cursos con json_agg)",
+            key="sql_una_consulta",
+            help="Trae el resumen y la lista de cursos en la misma consulta en vez de una segunda consulta a matriculas."
+        )
+        has_summary_table = postgres_has_summary_table()
+        sql_resumen = st.checkbox(
+            "Leer del resumen precalculado (resumen_estudiantes)",
+            key="sql_resumen",
+            disabled=not has_summary_table,
+            help="Tabla mantenida por triggers con los datos ya unidos y los agregados de matrículas: SQL optimizado para lectura, comparable con los documentos desnormalizados de MongoDB."
+        ) and has_summary_table
+        if not has_summary_table:
+            st.caption("Sin resumen precalculado: ejecuta `python setup_databases_fixed.py --indices-postgres`")
+        sql_preparada = st.checkbox(
+            "Sentencias preparadas (PREPARE / EXECUTE)",
+            key="sql_preparada",
+            help="Prepara cada consulta una vez por conexión y luego solo envía los parámetros: se evita analizar y reescribir la consulta en cada búsqueda. Con asyncio no aplica (asyncpg ya prepara las consultas automáticamente)."
+        )
+        sql_binario = st.checkbox(
+            "Resultados en formato binario (psycopg 3)",
+            key="sql_binario",
+            disabled=not postgres_binario_disponible(),
+            help="Usa un segundo pool con psycopg 3 y cursores binarios: los valores llegan en su representación binaria en vez de texto y el cliente no tiene que parsearlos. El costo de decodificar aparece en la etapa 'Leer resultados'."
+        ) and postgres_binario_disponible()
+        if not postgres_binario_disponible():
+            st.caption("Para el formato binario instala psycopg 3: `pip install \"psycopg[binary]\"`")
+        sql_plan_cache_mode = None
+        if sql_preparada:
+            sql_plan_cache_mode = st.selectbox(
+                "plan_cache_mode:",
+                PLAN_CACHE_MODES,
+                key="sql_plan_cache_mode",
+                help="auto: PostgreSQL usa planes a medida las primeras 5 ejecuciones y pasa al plan genérico si no es más caro. force_custom_plan / force_generic_plan fijan uno de los dos."
+            )
+        if sql_search_mode == SQL_MODO_PIPELINE:
+            st.caption("El pipeline usa siempre la forma de una sola consulta (cursos con json_agg) y se ejecuta con hilos.")
+        if sql_search_mode in (SQL_MODO_LOTES, SQL_MODO_PIPELINE):
+            sql_batch_size = st.number_input(
+                "Tamaño de lote SQL:",
+                min_value=1,
+                max_value=10000,
+                value=SQL_BATCH_SIZE,
+                step=100,
+                key="sql_batch_size"
+            )
+
         # Botón para iniciar búsqueda SQL. Usamos la selección guardada en session_state
         search_button_sql = st.button("Buscar TODOS en SQL", type="primary", key="sql_button", use_container_width=True)
 
@@ -376,26 +366,94 @@ with col1:
             # Desactivar temporalmente el multiselect para evitar modificaciones durante la búsqueda
             st.session_state['_searching_sql'] = True
 
-            total_time = 0
             results = []
             progress_bar = st.progress(0)
             status_text = st.empty()
 
-            for i, student_name in enumerate(selection):
-                status_text.text(f"Buscando {i+1}/{len(selection)}: {student_name}...")
-                result, elapsed = search_student_sql(student_name)
-                total_time += elapsed
-                if result:
-                    results.append(result)
-                progress_bar.progress((i + 1) / len(selection))
+            batch_times = None
+            sql_async = usar_async and postgres_async_disponible() and sql_search_mode != SQL_MODO_PIPELINE
+            # Desglose por etapa (solo el motor de hilos lo registra)
+            etapas = None if sql_async else {}
+
+            if sql_search_mode == SQL_MODO_LOTES:
+                batches = [selection[start:start + sql_batch_size] for start in range(0, len(selection), sql_batch_size)]
+
+                def on_progress(done, total):
+                    status_text.text(f"Lotes completados: {done}/{total}...")
+                    progress_bar.progress(done / total)
+
+                if sql_async:
+                    outputs, latencies, wall_time, completions = run_searches_async(
+                        batches,
+                        'postgres',
+                        lambda pool, batch: search_students_sql_batch_async(pool, batch, sql_una_consulta, sql_resumen),
+                        search_concurrency,
+                        on_progress
+                    )
+                else:
+                    outputs, latencies, wall_time, completions = run_searches(
+                        batches,
+                        lambda batch: search_students_sql_batch(batch, sql_una_consulta, sql_resumen, etapas,
+                                                                preparada=sql_preparada, plan_cache_mode=sql_plan_cache_mode, binario=sql_binario),
+                        search_concurrency,
+                        on_progress
+                    )
+                for batch_results in outputs:
+                    results.extend(batch_results)
+                batch_times = latencies
+            elif sql_search_mode == SQL_MODO_PIPELINE:
+                batches = [selection[start:start + sql_batch_size] for start in range(0, len(selection), sql_batch_size)]
+
+                def on_progress(done, total):
+                    status_text.text(f"Lotes completados: {done}/{total}...")
+                    progress_bar.progress(done / total)
+
+                outputs, latencies, wall_time, completions = run_searches(
+                    batches,
+                    lambda batch: search_students_sql_pipeline(batch, sql_coincidencia, sql_resumen, etapas, sql_binario),
+                    search_concurrency,
+                    on_progress
+                )
+                for batch_results in outputs:
+                    results.extend(batch_results)
+                batch_times = latencies
+            else:
+                def on_progress(done, total):
+                    status_text.text(f"Búsquedas completadas: {done}/{total}...")
+                    progress_bar.progress(done / total)
+
+                if sql_async:
+                    outputs, latencies, wall_time, completions = run_searches_async(
+                        selection,
+                        'postgres',
+                        lambda pool, student_name: search_student_sql_async(pool, student_name, sql_coincidencia, sql_una_consulta, sql_resumen),
+                        search_concurrency,
+                        on_progress
+                    )
+                else:
+                    outputs, latencies, wall_time, completions = run_searches(
+                        selection,
+                        lambda student_name: search_student_sql(student_name, sql_coincidencia, sql_una_consulta, sql_resumen, etapas,
+                                                                preparada=sql_preparada, plan_cache_mode=sql_plan_cache_mode, binario=sql_binario),
+                        search_concurrency,
+                        on_progress
+                    )
+                results = [result for result in outputs if result]
 
             progress_bar.empty()
             status_text.empty()
 
             # Guardar resultados en session_state
             st.session_state.sql_results = results
-            st.session_state.sql_time = total_time
+            st.session_state.sql_time = sum(latencies)
             st.session_state.sql_count = len(selection)
+            st.session_state.sql_batch_times = batch_times
+            st.session_state.sql_latencies = latencies
+            st.session_state.sql_completions = completions
+            st.session_state.sql_wall_time = wall_time
+            st.session_state.sql_concurrency = search_concurrency
+            st.session_state.sql_motor = MOTOR_ASYNC if sql_async else MOTOR_HILOS
+            st.session_state.sql_etapas = etapas
 
             # Marcar que búsqueda finalizó
             st.session_state['_searching_sql'] = False
@@ -410,12 +468,52 @@ with col1:
 
             col_time1, col_time2, col_time3 = st.columns(3)
             with col_time1:
-                st.metric("Tiempo TOTAL", f"{total_time:.4f}s")
+                st.metric("Tiempo TOTAL", f"{total_time:.4f}s", help="Suma de los tiempos de cada búsqueda (o lote), desde pedir la conexión hasta armar el resultado")
             with col_time2:
-                st.metric("Promedio", f"{total_time/count:.4f}s")
+                st.metric("Promedio", f"{total_time/count:.4f}s", help="Latencia promedio por estudiante")
             with col_time3:
                 st.metric("Búsquedas", count)
 
+            # Tiempo de pared y throughput (difieren del tiempo sumado cuando hay concurrencia)
+            wall_time = st.session_state.sql_wall_time
+            col_wall1, col_wall2, col_wall3 = st.columns(3)
+            with col_wall1:
+                st.metric("Tiempo de pared", f"{wall_time:.4f}s")
+            with col_wall2:
+                st.metric("Throughput", f"{count/wall_time:,.1f} búsq/s" if wall_time else "-")
+            with col_wall3:
+                st.metric("Concurrencia", st.session_state.sql_concurrency, help=f"Motor: {st.session_state.sql_motor}")
+
+            # Tiempos por lote (solo en modo por lotes)
+            batch_times = st.session_state.sql_batch_times
+            if batch_times:
+                col_batch1, col_batch2, col_batch3 = st.columns(3)
+                with col_batch1:
+                    st.metric("Lotes", len(batch_times))
+                with col_batch2:
+                    st.metric("Promedio por lote", f"{total_time/len(batch_times):.4f}s")
+                with col_batch3:
+                    st.metric("Lote más lento", f"{max(batch_times):.4f}s")
+
+            mostrar_distribucion_latencias(st.session_state.sql_latencies, st.session_state.sql_completions, "lote" if batch_times else "búsqueda")
+            mostrar_etapas(st.session_state.sql_etapas)
+
+            # Caché de planes de las sentencias preparadas (leída de las conexiones libres del pool)
+            if st.session_state.get('sql_preparada'):
+                with st.expander("Sentencias preparadas (caché de planes)"):
+                    prepared_stats = get_prepared_statement_stats()
+                    if prepared_stats:
+                        st.dataframe(
+                            [
+                                {'Sentencia': desc, 'Conexiones': conexiones, 'Planes genéricos': genericos, 'Planes a medida': a_medida}
+                                for desc, conexiones, genericos, a_medida in prepared_stats
+                            ],
+                            use_container_width=True
+                        )
+                        st.caption("Planes a medida: se planifica con los valores de cada llamada. Genéricos: se reutiliza un plan ya calculado (sin costo de planificación).")
+                    else:
+                        st.caption("Aún no hay sentencias preparadas en las conexiones libres del pool.")
+
             st.markdown("---")
 
             # Mostrar resultados en un formato compacto con paginación
@@ -460,6 +558,48 @@ with col2:
     st.markdown("**Base de datos documental sin relaciones**")
     st.info(f"Buscando {len(selected_students)} estudiante(s)")
 
+    # Modo de búsqueda: un find_one por nombre o bloques con un solo cursor
+    nosql_search_mode = st.radio(
+        "Modo de búsqueda NoSQL:",
+        [NOSQL_MODO_INDIVIDUAL, NOSQL_MODO_LOTES],
+        key="nosql_search_mode",
+        horizontal=True,
+        help="Por bloques resuelve cada bloque con un único cursor ($in) en vez de un find_one por estudiante."
+    )
+    # Las búsquedas asyncio decodifican el documento completo: la opción solo aplica con hilos
+    nosql_lazy_disponible = not (usar_async and mongo_async_disponible())
+    nosql_lazy = st.checkbox(
+        "Decodificación perezosa (RawBSONDocument)",
+        key="nosql_lazy",
+        disabled=not nosql_lazy_disponible,
+        help="Misma consulta y mismo documento, pero sin decodificarlo entero: solo los campos que se leen al armar el resultado (de cada matrícula, nota y créditos). Con muchas matrículas embebidas el ahorro en 'Decodificar' es notable."
+    ) and nosql_lazy_disponible
+    if not nosql_lazy_disponible:
+        st.caption("Con asyncio la decodificación perezosa no aplica: el documento se decodifica completo.")
+    nosql_chunk_size = NOSQL_CHUNK_SIZE
+    nosql_cursor_batch_size = NOSQL_CURSOR_BATCH_SIZE
+    if nosql_search_mode == NOSQL_MODO_LOTES:
+        col_chunk1, col_chunk2 = st.columns(2)
+        with col_chunk1:
+            nosql_chunk_size = st.number_input(
+                "Tamaño de bloque NoSQL:",
+                min_value=1,
+                max_value=10000,
+                value=NOSQL_CHUNK_SIZE,
+                step=100,
+                key="nosql_chunk_size"
+            )
+        with col_chunk2:
+            nosql_cursor_batch_size = st.number_input(
+                "batch_size del cursor:",
+                min_value=1,
+                max_value=10000,
+                value=NOSQL_CURSOR_BATCH_SIZE,
+                step=50,
+                key="nosql_cursor_batch_size",
+                help="Documentos que MongoDB devuelve por cada getMore del cursor."
+            )
+
     search_button_nosql = st.button("Buscar TODOS en NoSQL", type="primary", key="nosql_button", use_container_width=True)
 
     if search_button_nosql and st.session_state.get('selected_students'):
@@ -468,25 +608,73 @@ with col2:
         # Marcar búsqueda en curso para bloquear cambios si es necesario
         st.session_state['_searching_nosql'] = True
 
-        total_time = 0
         results = []
         progress_bar = st.progress(0)
         status_text = st.empty()
-
-        for i, student_name in enumerate(selection):
-            status_text.text(f"Buscando {i+1}/{len(selection)}: {student_name}...")
-            result, elapsed = search_student_nosql(student_name)
-            total_time += elapsed
-            if result:
-                results.append(result)
-            progress_bar.progress((i + 1) / len(selection))
+        batch_times = None
+        nosql_async = usar_async and mongo_async_disponible()
+        etapas = None if nosql_async else {}
+
+        if nosql_search_mode == NOSQL_MODO_LOTES:
+            batches = [selection[start:start + nosql_chunk_size] for start in range(0, len(selection), nosql_chunk_size)]
+
+            def on_progress(done, total):
+                status_text.text(f"Bloques completados: {done}/{total}...")
+                progress_bar.progress(done / total)
+
+            if nosql_async:
+                outputs, latencies, wall_time, completions = run_searches_async(
+                    batches,
+                    'mongo',
+                    lambda db, batch: search_students_nosql_batch_async(db, batch, nosql_cursor_batch_size),
+                    search_concurrency,
+                    on_progress
+                )
+            else:
+                outputs, latencies, wall_time, completions = run_searches(
+                    batches,
+                    lambda batch: search_students_nosql_batch(batch, nosql_cursor_batch_size, etapas, nosql_lazy),
+                    search_concurrency,
+                    on_progress
+                )
+            for batch_results in outputs:
+                results.extend(batch_results)
+            batch_times = latencies
+        else:
+            def on_progress(done, total):
+                status_text.text(f"Búsquedas completadas: {done}/{total}...")
+                progress_bar.progress(done / total)
+
+            if nosql_async:
+                outputs, latencies, wall_time, completions = run_searches_async(
+                    selection,
+                    'mongo',
+                    search_student_nosql_async,
+                    search_concurrency,
+                    on_progress
+                )
+            else:
+                outputs, latencies, wall_time, completions = run_searches(
+                    selection,
+                    lambda student_name: search_student_nosql(student_name, etapas, nosql_lazy),
+                    search_concurrency,
+                    on_progress
+                )
+            results = [result for result in outputs if result]
 
         progress_bar.empty()
         status_text.empty()
 
         st.session_state.nosql_results = results
-        st.session_state.nosql_time = total_time
+        st.session_state.nosql_time = sum(latencies)
         st.session_state.nosql_count = len(selection)
+        st.session_state.nosql_batch_times = batch_times
+        st.session_state.nosql_latencies = latencies
+        st.session_state.nosql_completions = completions
+        st.session_state.nosql_wall_time = wall_time
+        st.session_state.nosql_concurrency = search_concurrency
+        st.session_state.nosql_motor = MOTOR_ASYNC if nosql_async else MOTOR_HILOS
+        st.session_state.nosql_etapas = etapas
 
         st.session_state['_searching_nosql'] = False
 
@@ -500,12 +688,36 @@ with col2:
 
         col_time1, col_time2, col_time3 = st.columns(3)
         with col_time1:
-            st.metric("Tiempo TOTAL", f"{total_time:.4f}s")
+            st.metric("Tiempo TOTAL", f"{total_time:.4f}s", help="Suma de los tiempos de cada búsqueda (o lote), desde pedir la conexión hasta armar el resultado")
         with col_time2:
-            st.metric("Promedio", f"{total_time/count:.4f}s")
+            st.metric("Promedio", f"{total_time/count:.4f}s", help="Latencia promedio por estudiante")
         with col_time3:
             st.metric("Búsquedas", count)
 
+        # Tiempo de pared y throughput (difieren del tiempo sumado cuando hay concurrencia)
+        wall_time = st.session_state.nosql_wall_time
+        col_wall1, col_wall2, col_wall3 = st.columns(3)
+        with col_wall1:
+            st.metric("Tiempo de pared", f"{wall_time:.4f}s")
+        with col_wall2:
+            st.metric("Throughput", f"{count/wall_time:,.1f} búsq/s" if wall_time else "-")
+        with col_wall3:
+            st.metric("Concurrencia", st.session_state.nosql_concurrency, help=f"Motor: {st.session_state.nosql_motor}")
+
+        # Tiempos por bloque (solo en modo por bloques)
+        batch_times = st.session_state.nosql_batch_times
+        if batch_times:
+            col_batch1, col_batch2, col_batch3 = st.columns(3)
+            with col_batch1:
+                st.metric("Bloques", len(batch_times))
+            with col_batch2:
+                st.metric("Promedio por bloque", f"{total_time/len(batch_times):.4f}s")
+            with col_batch3:
+                st.metric("Bloque más lento", f"{max(batch_times):.4f}s")
+
+        mostrar_distribucion_latencias(st.session_state.nosql_latencies, st.session_state.nosql_completions, "bloque" if batch_times else "búsqueda")
+        mostrar_etapas(st.session_state.nosql_etapas)
+
         st.markdown("---")
 
         # Mostrar resultados en un formato compacto con paginación
@@ -544,6 +756,84 @@ with col2:
         else:
             st.warning("❌ No se encontraron estudiantes")
 
+# Modo explain: planes reales de una muestra de la selección
+st.markdown("---")
+st.markdown("### 🔬 Planes de consulta (EXPLAIN)")
+st.caption("Ejecuta `EXPLAIN (ANALYZE, BUFFERS)` de la consulta de búsqueda SQL (con las opciones elegidas arriba) y `explain('executionStats')` del `find_one` de MongoDB para algunos de los estudiantes seleccionados.")
+
+col_explain1, col_explain2 = st.columns([1, 3])
+with col_explain1:
+    explain_sample_size = st.number_input("Estudiantes de muestra:", min_value=1, max_value=50, value=3, key="explain_sample_size")
+with col_explain2:
+    st.write("")
+    explain_button = st.button("Capturar planes", key="explain_button")
+
+if explain_button and st.session_state.get('selected_students'):
+    muestra = muestra_estudiantes(list(st.session_state['selected_students']), explain_sample_size)
+    planes_sql, planes_nosql, errores = [], [], []
+    for nombre in muestra:
+        # Con las mismas opciones que usa la búsqueda SQL (en lotes la coincidencia es siempre
+        # exacta y el pipeline siempre trae los cursos en la misma consulta)
+        if pg_pool is not None:
+            try:
+                planes_sql.append(explain_student_sql(
+                    nombre,
+                    sql_coincidencia,
+                    sql_una_consulta or sql_search_mode == SQL_MODO_PIPELINE,
+                    sql_resumen
+                ))
+            except Exception as e:
+                errores.append(f"PostgreSQL ({nombre}): {e}")
+        if get_mongo_connection() is not None:
+            try:
+                planes_nosql.append(explain_student_nosql(nombre))
+            except Exception as e:
+                errores.append(f"MongoDB ({nombre}): {e}")
+    st.session_state['explain_sql'] = planes_sql
+    st.session_state['explain_nosql'] = planes_nosql
+    st.session_state['explain_errores'] = errores
+
+for error in st.session_state.get('explain_errores', []):
+    st.error(error)
+
+if st.session_state.get('explain_sql') or st.session_state.get('explain_nosql'):
+    col_plan1, col_plan2 = st.columns(2)
+
+    with col_plan1:
+        st.subheader("📘 PostgreSQL")
+        for plan in st.session_state.get('explain_sql', []):
+            with st.expander(f"{plan['estudiante']} - {plan['tiempo_ejecucion_ms']:.3f} ms"):
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    st.write(f"**Planificación:** {plan['tiempo_planificacion_ms']:.3f} ms")
+                    st.write(f"**Ejecución:** {plan['tiempo_ejecucion_ms']:.3f} ms")
+                    st.write(f"**Filas devueltas:** {plan['filas']}")
+                    st.write(f"**Filas descartadas por filtros:** {plan['filas_descartadas']:,}")
+                with col_b:
+                    st.write(f"**Buffers en caché (hit):** {plan['buffers_hit']:,}")
+                    st.write(f"**Buffers leídos de disco:** {plan['buffers_read']:,}")
+                    st.write(f"**Índices usados:** {', '.join(plan['indices']) or 'ninguno'}")
+                    if plan['recorridos_secuenciales']:
+                        st.write(f"⚠️ **Seq Scan en:** {', '.join(plan['recorridos_secuenciales'])}")
+                st.dataframe(plan['nodos'], use_container_width=True)
+                st.json(plan['plan'], expanded=False)
+
+    with col_plan2:
+        st.subheader("📗 MongoDB")
+        for plan in st.session_state.get('explain_nosql', []):
+            with st.expander(f"{plan['estudiante']} - {plan['tiempo_ejecucion_ms']} ms"):
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    st.write(f"**Devueltos:** {plan['devueltos']}")
+                    st.write(f"**Claves examinadas:** {plan['claves_examinadas']:,}")
+                    st.write(f"**Documentos examinados:** {plan['documentos_examinados']:,}")
+                with col_b:
+                    st.write(f"**Etapas:** {' → '.join(e['etapa'] for e in plan['etapas'])}")
+                    st.write(f"**Índices usados:** {', '.join(plan['indices']) or 'ninguno'}")
+                    if plan['recorrido_completo']:
+                        st.write("⚠️ **COLLSCAN:** recorre toda la colección")
+                st.json(plan['plan'], expanded=False)
+
 # Sección de información
 st.markdown("---")
 st.markdown("""
@@ -604,9 +894,25 @@ else:
 st.sidebar.markdown("---")
 
 # Verificar conexiones
-pg_conn = get_postgres_connection()
-if pg_conn is not None:
+pg_pool = get_postgres_pool()
+if pg_pool is not None:
     st.sidebar.success("✅ PostgreSQL conectado")
+    pool_stats = pg_pool.estadisticas()
+    with st.sidebar.expander("Pool de conexiones PostgreSQL"):
+        st.progress(pool_stats['en_uso'] / pool_stats['maxconn'],
+                    text=f"En uso: {pool_stats['en_uso']}/{pool_stats['maxconn']} (abiertas: {pool_stats['abiertas']})")
+        st.write(f"**Máximo simultáneo:** {pool_stats['max_en_uso']}")
+        st.write(f"**Espera promedio:** {pool_stats['espera_promedio'] * 1000:.3f} ms")
+        st.write(f"**Espera máxima:** {pool_stats['espera_max'] * 1000:.3f} ms")
+        st.write(f"**Esperas por pool lleno:** {pool_stats['esperas']} de {pool_stats['entregas']}")
+        st.write(f"**Reconexiones:** {pool_stats['reconexiones']}")
+    index_stats = get_postgres_index_stats()
+    if index_stats:
+        with st.sidebar.expander("Índices de estudiantes"):
+            for index_name, index_size, index_scans in index_stats:
+                st.write(f"**{index_name}**: {index_size} ({index_scans} scans)")
+            if not any(name == 'idx_estudiantes_nombre_trgm' for name, _, _ in index_stats):
+                st.caption("Sin índice de trigramas: ejecuta `python setup_databases_fixed.py --indices-postgres`")
 else:
     if IS_CLOUD:
         st.sidebar.warning("⚠️ PostgreSQL no disponible")
@@ -616,6 +922,8 @@ else:
 mongo_db = get_mongo_connection()
 if mongo_db is not None:
     st.sidebar.success("✅ MongoDB conectado")
+    if not mongo_has_full_name_index():
+        st.sidebar.warning("⚠️ Falta el índice de nombre_completo. Ejecuta: `python setup_databases_fixed.py --migrar-mongo`")
 else:
     st.sidebar.error("❌ MongoDB no disponible")
 
@@ -0,0 +1,307 @@
+"""
+Benchmark sin interfaz de las búsquedas SQL vs NoSQL
+Ejecuta las mismas cargas que los botones "Buscar TODOS" de la app, con calentamiento,
+varias repeticiones y salida JSON/CSV para máquinas dedicadas y ejecuciones nocturnas.
+
+Ejemplos:
+    python benchmark.py --estudiantes 1000 --repeticiones 5
+    python benchmark.py --motor sql --modo lotes --ejecucion async --concurrencia 32 --json resultados.json
+    python benchmark.py --csv - > resultados.csv
+"""
+import argparse
+import csv
+import json
+import platform
+import random
+import sys
+from datetime import datetime
+
+import busquedas
+from busquedas import (
+    SQL_BATCH_SIZE, NOSQL_CHUNK_SIZE, NOSQL_CURSOR_BATCH_SIZE,
+    SQL_COINCIDENCIA_SUBCADENA, SQL_COINCIDENCIA_TRIGRAMAS, SQL_COINCIDENCIA_EXACTA,
+    search_student_sql, search_students_sql_batch, search_students_sql_pipeline,
+    search_student_nosql, search_students_nosql_batch,
+    ETAPAS, PLAN_CACHE_MODES, run_searches, resumen_latencias,
+)
+import motores_async
+
+COINCIDENCIAS = {
+    'subcadena': SQL_COINCIDENCIA_SUBCADENA,
+    'trigramas': SQL_COINCIDENCIA_TRIGRAMAS,
+    'exacta': SQL_COINCIDENCIA_EXACTA,
+}
+
+# Columnas de la salida CSV (una fila por repetición y motor)
+CAMPOS_CSV = [
+    'motor', 'ejecucion', 'modo', 'repeticion', 'busquedas', 'encontrados', 'llamadas',
+    'tiempo_pared', 'throughput', 'tiempo_total', 'promedio', 'min', 'p50', 'p95', 'p99', 'max',
+    'cpu_cliente',
+] + [f'etapa_{etapa}' for etapa in ETAPAS]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de búsquedas de estudiantes en PostgreSQL y MongoDB")
+    parser.add_argument('--motor', choices=['sql', 'nosql', 'ambos'], default='ambos',
+                        help="Base de datos a medir (por defecto ambas)")
+    parser.add_argument('--modo', choices=['individual', 'lotes', 'pipeline'], default='individual',
+                        help="Una consulta por estudiante, lotes set-based / bloques $in o pipeline de psycopg 3 (solo SQL)")
+    parser.add_argument('--ejecucion', choices=['hilos', 'async'], default='hilos',
+                        help="Motor de ejecución: hilos con psycopg2/pymongo o asyncio con asyncpg/MongoDB async")
+    parser.add_argument('--concurrencia', type=int, default=busquedas.SEARCH_CONCURRENCY,
+                        help="Hilos, o consultas en vuelo con --ejecucion async")
+    parser.add_argument('--estudiantes', type=int, default=100,
+                        help="Cantidad de estudiantes a buscar en cada repetición")
+    parser.add_argument('--aleatorio', action='store_true',
+                        help="Elegir los estudiantes al azar en vez de los primeros de la lista")
+    parser.add_argument('--semilla', type=int, default=42,
+                        help="Semilla para --aleatorio (la misma selección en cada corrida)")
+    parser.add_argument('--calentamiento', type=int, default=1,
+                        help="Repeticiones de calentamiento que no se registran")
+    parser.add_argument('--repeticiones', type=int, default=5,
+                        help="Repeticiones medidas")
+    parser.add_argument('--coincidencia', choices=list(COINCIDENCIAS), default='exacta',
+                        help="Coincidencia por nombre en SQL individual")
+    parser.add_argument('--una-consulta', action='store_true',
+                        help="SQL: cursos agregados con json_agg en la misma consulta")
+    parser.add_argument('--resumen', action='store_true',
+                        help="SQL: leer de la tabla resumen_estudiantes")
+    parser.add_argument('--preparadas', action='store_true',
+                        help="SQL (hilos): sentencias preparadas por conexión (PREPARE / EXECUTE)")
+    parser.add_argument('--plan-cache-mode', choices=PLAN_CACHE_MODES, default=None,
+                        help="SQL: plan_cache_mode de las sesiones con --preparadas")
+    parser.add_argument('--binario', action='store_true',
+                        help="SQL (hilos): resultados en formato binario con psycopg 3")
+    parser.add_argument('--lazy', action='store_true',
+                        help="NoSQL (hilos): decodificación perezosa con RawBSONDocument, solo los campos que se leen")
+    parser.add_argument('--lote', type=int, default=None,
+                        help=f"Tamaño de lote SQL / bloque NoSQL (por defecto {SQL_BATCH_SIZE} / {NOSQL_CHUNK_SIZE})")
+    parser.add_argument('--cursor-batch-size', type=int, default=NOSQL_CURSOR_BATCH_SIZE,
+                        help="batch_size del cursor de MongoDB en modo lotes")
+    parser.add_argument('--json', metavar='RUTA',
+                        help="Guardar los resultados en JSON ('-' para la salida estándar)")
+    parser.add_argument('--csv', metavar='RUTA',
+                        help="Guardar los resultados en CSV ('-' para la salida estándar)")
+    return parser.parse_args(argv)
+
+def log(mensaje):
+    """Mensajes de avance por stderr, para que stdout quede libre para JSON/CSV"""
+    print(mensaje, file=sys.stderr, flush=True)
+
+def elegir_estudiantes(args):
+    """Selección de estudiantes de la misma lista que usa la app"""
+    if args.ejecucion == 'async':
+        estudiantes = motores_async.get_all_students_async()
+    else:
+        estudiantes = busquedas.get_all_students_postgres()
+
+    if args.aleatorio:
+        return random.Random(args.semilla).sample(estudiantes, min(args.estudiantes, len(estudiantes)))
+    return estudiantes[:args.estudiantes]
+
+def crear_carga(motor, args):
+    """Devuelve ejecutar(seleccion) -> (resultados, latencias, tiempo de pared, etapas), igual que los botones de la app.
+
+    etapas es el desglose por etapa y CPU del cliente (None con asyncio, que no lo registra).
+    """
+    pipeline = motor == 'sql' and args.modo == 'pipeline'
+    lotes = args.modo == 'lotes' or pipeline
+    usar_async = args.ejecucion == 'async' and not pipeline
+    # Diccionario de etapas de la repetición en curso (lo leen las lambdas del motor de hilos)
+    medicion = {'etapas': None}
+
+    if motor == 'sql':
+        tamano_lote = args.lote or SQL_BATCH_SIZE
+        if pipeline:
+            fn = lambda batch: search_students_sql_pipeline(batch, COINCIDENCIAS[args.coincidencia], args.resumen,
+                                                            medicion['etapas'], args.binario)
+        elif lotes and usar_async:
+            fn = lambda pool, batch: motores_async.search_students_sql_batch_async(pool, batch, args.una_consulta, args.resumen)
+        elif lotes:
+            fn = lambda batch: search_students_sql_batch(batch, args.una_consulta, args.resumen, medicion['etapas'],
+                                                       preparada=args.preparadas, plan_cache_mode=args.plan_cache_mode, binario=args.binario)
+        elif usar_async:
+            fn = lambda pool, name: motores_async.search_student_sql_async(pool, name, COINCIDENCIAS[args.coincidencia], args.una_consulta, args.resumen)
+        else:
+            fn = lambda name: search_student_sql(name, COINCIDENCIAS[args.coincidencia], args.una_consulta, args.resumen, medicion['etapas'],
+                                         preparada=args.preparadas, plan_cache_mode=args.plan_cache_mode, binario=args.binario)
+    else:
+        tamano_lote = args.lote or NOSQL_CHUNK_SIZE
+        if lotes and usar_async:
+            fn = lambda db, batch: motores_async.search_students_nosql_batch_async(db, batch, args.cursor_batch_size)
+        elif lotes:
+            fn = lambda batch: search_students_nosql_batch(batch, args.cursor_batch_size, medicion['etapas'], args.lazy)
+        elif usar_async:
+            fn = motores_async.search_student_nosql_async
+        else:
+            fn = lambda name: search_student_nosql(name, medicion['etapas'], args.lazy)
+
+    def ejecutar(seleccion):
+        tareas = [seleccion[start:start + tamano_lote] for start in range(0, len(seleccion), tamano_lote)] if lotes else seleccion
+        if usar_async:
+            outputs, latencies, wall_time, _ = motores_async.run_searches_async(
+                tareas, 'postgres' if motor == 'sql' else 'mongo', fn, args.concurrencia)
+        else:
+            medicion['etapas'] = {}
+            outputs, latencies, wall_time, _ = run_searches(tareas, fn, args.concurrencia)
+
+        if lotes:
+            resultados = [r for batch_results in outputs for r in batch_results]
+        else:
+            resultados = [r for r in outputs if r]
+        return resultados, latencies, wall_time, medicion['etapas']
+
+    return ejecutar
+
+def motor_disponible(motor, args):
+    """Comprueba la conexión (y el driver asyncio si corresponde) antes de medir"""
+    if motor == 'sql':
+        if args.ejecucion == 'async' and args.modo != 'pipeline' and not motores_async.postgres_async_disponible():
+            return "asyncpg no está instalado"
+        if (args.binario or args.modo == 'pipeline') and busquedas.get_postgres_pool_binario() is None:
+            return f"psycopg 3 no disponible: {busquedas.connection_error('postgres_binario') or 'no está instalado'}"
+        if busquedas.get_postgres_pool() is None:
+            return f"PostgreSQL no disponible: {busquedas.connection_error('postgres')}"
+    else:
+        if args.ejecucion == 'async' and not motores_async.mongo_async_disponible():
+            return "no hay driver asyncio para MongoDB (pymongo>=4.9 o motor)"
+        if busquedas.get_mongo_connection() is None:
+            return f"MongoDB no disponible: {busquedas.connection_error('mongo')}"
+    return None
+
+def medir(motor, seleccion, args):
+    """Calentamiento + repeticiones de un motor; devuelve una fila por repetición"""
+    ejecutar = crear_carga(motor, args)
+
+    for i in range(args.calentamiento):
+        log(f"  {motor}: calentamiento {i + 1}/{args.calentamiento}")
+        ejecutar(seleccion)
+
+    filas = []
+    for i in range(args.repeticiones):
+        resultados, latencias, tiempo_pared, etapas = ejecutar(seleccion)
+        stats = resumen_latencias(latencias)
+        etapas = etapas or {}
+        fila = {
+            'motor': motor,
+            # El pipeline es solo SQL y siempre con hilos; en NoSQL equivale a la búsqueda individual
+            'ejecucion': 'hilos' if motor == 'sql' and args.modo == 'pipeline' else args.ejecucion,
+            'modo': 'individual' if motor == 'nosql' and args.modo == 'pipeline' else args.modo,
+            'repeticion': i + 1,
+            'busquedas': len(seleccion),
+            'encontrados': len(resultados),
+            'llamadas': stats['n'],
+            'tiempo_pared': tiempo_pared,
+            'throughput': len(seleccion) / tiempo_pared if tiempo_pared else 0.0,
+            'tiempo_total': stats['total'],
+            'promedio': stats['promedio'],
+            'min': stats['min'],
+            'p50': stats['p50'],
+            'p95': stats['p95'],
+            'p99': stats['p99'],
+            'max': stats['max'],
+            'cpu_cliente': etapas.get('cpu'),
+        }
+        fila.update({f'etapa_{etapa}': etapas.get(etapa) for etapa in ETAPAS})
+        filas.append(fila)
+        log(f"  {motor}: repetición {i + 1}/{args.repeticiones} - pared {tiempo_pared:.4f}s, "
+            f"{fila['throughput']:,.1f} búsq/s, p95 {stats['p95'] * 1000:.2f} ms")
+
+    return filas
+
+def resumir(filas):
+    """Mediana entre repeticiones de cada métrica, por motor"""
+    resumen = {}
+    for motor in sorted({f['motor'] for f in filas}):
+        del_motor = [f for f in filas if f['motor'] == motor]
+        resumen[motor] = {
+            campo: busquedas.percentil(sorted(f[campo] for f in del_motor), 50)
+            for campo in ('tiempo_pared', 'throughput', 'tiempo_total', 'promedio', 'p50', 'p95', 'p99', 'max')
+        }
+    return resumen
+
+def abrir_salida(ruta):
+    return sys.stdout if ruta == '-' else open(ruta, 'w', newline='', encoding='utf-8')
+
+def escribir_json(ruta, args, filas, preparadas=None):
+    documento = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'host': platform.node(),
+        },
+        'configuracion': vars(args),
+        'repeticiones': filas,
+        'resumen': resumir(filas),
+    }
+    if preparadas is not None:
+        documento['sentencias_preparadas'] = [
+            {'sentencia': desc, 'conexiones': conexiones, 'planes_genericos': genericos, 'planes_a_medida': a_medida}
+            for desc, conexiones, genericos, a_medida in preparadas
+        ]
+    salida = abrir_salida(ruta)
+    try:
+        json.dump(documento, salida, ensure_ascii=False, indent=2)
+        salida.write('\n')
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+
+def escribir_csv(ruta, filas):
+    salida = abrir_salida(ruta)
+    try:
+        writer = csv.DictWriter(salida, fieldnames=CAMPOS_CSV)
+        writer.writeheader()
+        writer.writerows(filas)
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.json == '-' and args.csv == '-':
+        log("✗ Solo una de --json y --csv puede ir a la salida estándar")
+        return 2
+
+    motores = ['sql', 'nosql'] if args.motor == 'ambos' else [args.motor]
+    if args.lazy and args.ejecucion == 'async' and 'nosql' in motores:
+        log("✗ --lazy solo aplica al motor de hilos: las búsquedas asyncio decodifican el documento completo")
+        return 2
+    for motor in motores:
+        error = motor_disponible(motor, args)
+        if error:
+            log(f"✗ {error}")
+            return 1
+
+    seleccion = elegir_estudiantes(args)
+    if not seleccion:
+        log("✗ No hay estudiantes cargados. Ejecuta primero: python setup_databases_fixed.py")
+        return 1
+
+    log(f"Benchmark: {len(seleccion)} estudiantes, modo {args.modo}, ejecución {args.ejecucion}, "
+        f"concurrencia {args.concurrencia}, {args.calentamiento} calentamiento(s), {args.repeticiones} repetición(es)")
+
+    filas = []
+    for motor in motores:
+        filas.extend(medir(motor, seleccion, args))
+
+    for motor, stats in resumir(filas).items():
+        log(f"✓ {motor}: mediana pared {stats['tiempo_pared']:.4f}s, {stats['throughput']:,.1f} búsq/s, "
+            f"p50 {stats['p50'] * 1000:.2f} ms, p99 {stats['p99'] * 1000:.2f} ms")
+
+    # Caché de planes de las sentencias preparadas (genéricos vs a medida)
+    preparadas = None
+    if args.preparadas and 'sql' in motores and args.ejecucion == 'hilos':
+        preparadas = busquedas.get_prepared_statement_stats()
+        for desc, conexiones, genericos, a_medida in preparadas:
+            log(f"  {desc}: {genericos} planes genéricos, {a_medida} a medida ({conexiones} conexión(es))")
+
+    if args.json:
+        escribir_json(args.json, args, filas, preparadas)
+    if args.csv:
+        escribir_csv(args.csv, filas)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1009 @@
+"""
+Búsquedas de estudiantes en PostgreSQL y MongoDB
+Lógica compartida por la app de Streamlit y los demás scripts (sin dependencia de Streamlit)
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psycopg2
+import psycopg2.extensions
+from bson import decode as bson_decode
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient
+
+from pool_postgres import PoolPostgres
+
+# psycopg 3 es opcional: habilita la transferencia de resultados en formato binario
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+# Detectar si estamos en Streamlit Cloud
+IS_CLOUD = os.getenv('STREAMLIT_SHARING_MODE') is not None or os.getenv('STREAMLIT_CLOUD') is not None
+
+PG_CONFIG = {
+    'host': 'localhost',
+    'port': 5432,
+    'user': 'postgres',
+    'password': 'postgres',
+    'database': 'universidad_db'
+}
+
+# Pool de conexiones PostgreSQL compartido por todas las sesiones (ajustable por variables de entorno)
+PG_POOL_CONFIG = {
+    'minconn': int(os.getenv('PG_POOL_MIN', 1)),
+    'maxconn': int(os.getenv('PG_POOL_MAX', 10)),
+    'timeout': float(os.getenv('PG_POOL_TIMEOUT', 30)),
+}
+
+# MongoDB: usar Atlas si está en la nube, local si no
+if IS_CLOUD:
+    # Conexión a MongoDB Atlas (nube)
+    MONGO_URI = os.getenv('MONGO_URI', 'mongodb+srv://cluster0.mongodb.net/')
+    MONGO_CONFIG = {
+        'uri': MONGO_URI,
+        'database': 'universidad_db'
+    }
+else:
+    # Conexión local
+    MONGO_CONFIG = {
+        'host': 'localhost',
+        'port': 27017,
+        'database': 'universidad_db'
+    }
+
+# Conexiones compartidas: se crean la primera vez que se piden y viven lo que dure el proceso.
+# Un fallo no queda guardado: se reintenta, pero con una espera que se duplica en cada
+# fallo seguido (hasta RECONEXION_ESPERA_MAXIMA) para no intentar conectar en cada búsqueda.
+RECONEXION_ESPERA_INICIAL = 1.0  # segundos
+RECONEXION_ESPERA_MAXIMA = 60.0
+_connections_lock = threading.Lock()
+_postgres_pool = None
+_postgres_pool_binario = None
+_mongo_db = None
+_connection_errors = {}
+_reintentos = {}  # motor -> (fallos seguidos, momento a partir del cual se puede reintentar)
+
+class ConexionPostgres(psycopg2.extensions.connection):
+    """Conexión de psycopg2 que recuerda su estado de sesión en el servidor:
+    las sentencias preparadas que ya tiene y el plan_cache_mode configurado"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+        self.plan_cache_mode = None
+
+def connect_postgres():
+    """Abre una conexión nueva a PostgreSQL (en autocommit: la app solo lee)"""
+    conn = psycopg2.connect(**PG_CONFIG, connection_factory=ConexionPostgres)
+    conn.autocommit = True
+    return conn
+
+def _conectar(motor, crear):
+    """Llama a crear() para abrir la conexión de `motor`, salvo que todavía esté en la
+    espera de un fallo anterior. Se llama con _connections_lock tomado.
+
+    Devuelve la conexión, o None si falló o no tocaba reintentar; el error queda
+    en connection_error(motor) hasta que un intento salga bien.
+    """
+    fallos, reintento = _reintentos.get(motor, (0, 0.0))
+    if time.monotonic() < reintento:
+        return None
+    try:
+        conexion = crear()
+    except Exception as e:
+        _connection_errors[motor] = e
+        espera = min(RECONEXION_ESPERA_MAXIMA, RECONEXION_ESPERA_INICIAL * 2 ** fallos)
+        _reintentos[motor] = (fallos + 1, time.monotonic() + espera)
+        return None
+    _connection_errors.pop(motor, None)
+    _reintentos.pop(motor, None)
+    return conexion
+
+def get_postgres_pool():
+    """Obtiene el pool de conexiones a PostgreSQL (None en la nube o si no se pudo conectar)"""
+    global _postgres_pool
+
+    # Si estamos en la nube, no intentar conectar
+    if IS_CLOUD:
+        return None
+
+    with _connections_lock:
+        if _postgres_pool is None:
+            _postgres_pool = _conectar('postgres', lambda: PoolPostgres(connect_postgres, **PG_POOL_CONFIG))
+        return _postgres_pool
+
+def connect_postgres_binario():
+    """Abre una conexión de psycopg 3 (permite pedir los resultados en formato binario)"""
+    conn = psycopg.connect(
+        host=PG_CONFIG['host'],
+        port=PG_CONFIG['port'],
+        user=PG_CONFIG['user'],
+        password=PG_CONFIG['password'],
+        dbname=PG_CONFIG['database'],
+        autocommit=True
+    )
+    # Igual que ConexionPostgres: el plan_cache_mode configurado en la sesión
+    conn.plan_cache_mode = None
+    return conn
+
+def postgres_binario_disponible():
+    """Indica si está instalado psycopg 3 (necesario para el protocolo binario)"""
+    return psycopg is not None and not IS_CLOUD
+
+def get_postgres_pool_binario():
+    """Pool de conexiones psycopg 3 para el modo binario (None si no está disponible)"""
+    global _postgres_pool_binario
+
+    if not postgres_binario_disponible():
+        return None
+
+    with _connections_lock:
+        if _postgres_pool_binario is None:
+            _postgres_pool_binario = _conectar('postgres_binario',
+                                               lambda: PoolPostgres(connect_postgres_binario, **PG_POOL_CONFIG))
+        return _postgres_pool_binario
+
+def connect_mongo():
+    """Abre el cliente de MongoDB y verifica la conexión; devuelve la base de datos"""
+    if IS_CLOUD and 'uri' in MONGO_CONFIG:
+        # Conexión a MongoDB Atlas
+        client = MongoClient(MONGO_CONFIG['uri'])
+    else:
+        # Conexión local
+        client = MongoClient(MONGO_CONFIG['host'], MONGO_CONFIG['port'])
+
+    db = client[MONGO_CONFIG['database']]
+    # Verificar conexión
+    db.list_collection_names()
+    return db
+
+def get_mongo_connection():
+    """Obtiene la base de datos de MongoDB (None si no se pudo conectar)"""
+    global _mongo_db
+
+    with _connections_lock:
+        if _mongo_db is None:
+            _mongo_db = _conectar('mongo', connect_mongo)
+        return _mongo_db
+
+def connection_error(motor):
+    """Error del último intento fallido de conectar a 'postgres', 'postgres_binario' o
+    'mongo' (None si está conectado o todavía no falló)"""
+    return _connection_errors.get(motor)
+
+def get_all_students_postgres():
+    """Obtiene lista de TODOS los estudiantes de PostgreSQL ordenados alfabéticamente"""
+    pool = get_postgres_pool()
+    if not pool:
+        # Si PostgreSQL no está disponible, usar MongoDB
+        return get_all_students_mongo()
+
+    try:
+        with pool.conexion() as conn:
+            cursor = conn.cursor()
+            # Traer TODOS los estudiantes ordenados alfabéticamente para el combobox
+            cursor.execute("SELECT nombre, apellido FROM estudiantes ORDER BY apellido, nombre")
+            students = [f"{row[0]} {row[1]}" for row in cursor.fetchall()]
+            cursor.close()
+        return students
+    except Exception as e:
+        # Si hay error (ej: tabla no existe), usar MongoDB
+        return get_all_students_mongo()
+
+def get_all_students_mongo():
+    """Obtiene lista de TODOS los estudiantes de MongoDB ordenados alfabéticamente"""
+    db = get_mongo_connection()
+    if db is None:
+        return []
+
+    # Obtener todos los estudiantes y ordenar
+    students = db.estudiantes.find({}, {'nombre': 1, 'apellido': 1}).sort([('apellido', 1), ('nombre', 1)])
+    return [f"{s['nombre']} {s['apellido']}" for s in students]
+
+# Etapas medidas en cada búsqueda:
+# conexion (sacar/devolver la conexión del pool), ejecutar (enviar la consulta y esperar la
+# primera respuesta), leer (traer el resto de filas/documentos), decodificar (tipos del driver
+# a objetos de Python) y transformar (armar el diccionario que muestra la app)
+ETAPAS = ('conexion', 'ejecutar', 'leer', 'decodificar', 'transformar')
+_etapas_lock = threading.Lock()
+
+class Cronometro:
+    """Mide etapas consecutivas de una búsqueda con perf_counter y el CPU del hilo con thread_time"""
+
+    def __init__(self):
+        self.inicio = self._ultimo = time.perf_counter()
+        self.cpu_inicio = time.thread_time()
+        self.etapas = dict.fromkeys(ETAPAS, 0.0)
+
+    def marcar(self, etapa):
+        """Asigna a `etapa` el tiempo transcurrido desde la marca anterior"""
+        ahora = time.perf_counter()
+        self.etapas[etapa] += ahora - self._ultimo
+        self._ultimo = ahora
+
+    def terminar(self, etapas=None):
+        """Devuelve el tiempo total y, si se pasa un diccionario, le suma las etapas, el CPU y el total"""
+        total = self._ultimo - self.inicio
+        if etapas is not None:
+            cpu = time.thread_time() - self.cpu_inicio
+            with _etapas_lock:
+                for etapa, segundos in self.etapas.items():
+                    etapas[etapa] = etapas.get(etapa, 0.0) + segundos
+                etapas['cpu'] = etapas.get('cpu', 0.0) + cpu
+                etapas['total'] = etapas.get('total', 0.0) + total
+        return total
+
+# Columnas del resumen por estudiante (mismo orden en todas las variantes de búsqueda SQL)
+SQL_SELECT_ESTUDIANTE = """
+    SELECT 
+        e.id,
+        e.nombre,
+        e.apellido,
+        e.email,
+        e.edad,
+        e.carrera,
+        e.año_ingreso,
+        e.promedio,
+        u.nombre as universidad,
+        u.ciudad as ciudad_universidad,
+        p_uni.nombre as pais_universidad,
+        p_ori.nombre as pais_origen,
+        p_ori.codigo as codigo_pais,
+        COUNT(m.id) as total_cursos,
+        AVG(m.nota) as promedio_cursos,
+        SUM(m.creditos) as total_creditos
+"""
+
+# Lista de cursos agregada como JSON para resolver resumen + cursos en una sola consulta
+SQL_CURSOS_JSON = """
+        , COALESCE(
+            json_agg(
+                json_build_object('curso', m.curso, 'semestre', m.semestre, 'nota', m.nota, 'creditos', m.creditos)
+                ORDER BY m.semestre, m.curso
+            ) FILTER (WHERE m.id IS NOT NULL),
+            '[]'::json
+        ) as cursos
+"""
+
+# Lectura desde resumen_estudiantes: datos y agregados ya precalculados (sin JOINs ni GROUP BY).
+# Usa el alias e para que los filtros de SQL_FILTROS sirvan sin cambios.
+SQL_SELECT_RESUMEN = """
+    SELECT 
+        e.id,
+        e.nombre,
+        e.apellido,
+        e.email,
+        e.edad,
+        e.carrera,
+        e.año_ingreso,
+        e.promedio,
+        e.universidad,
+        e.ciudad_universidad,
+        e.pais_universidad,
+        e.pais_origen,
+        e.codigo_pais,
+        e.total_cursos,
+        e.suma_notas / NULLIF(e.total_cursos, 0) as promedio_cursos,
+        e.total_creditos
+"""
+
+SQL_CURSOS_JSON_RESUMEN = """
+        , COALESCE(
+            (SELECT json_agg(
+                        json_build_object('curso', m.curso, 'semestre', m.semestre, 'nota', m.nota, 'creditos', m.creditos)
+                        ORDER BY m.semestre, m.curso
+                    )
+             FROM matriculas m
+             WHERE m.estudiante_id = e.id),
+            '[]'::json
+        ) as cursos
+"""
+
+SQL_FROM_ESTUDIANTE = """
+    FROM estudiantes e
+    JOIN universidades u ON e.universidad_id = u.id
+    JOIN paises p_uni ON u.pais_id = p_uni.id
+    JOIN paises p_ori ON e.pais_origen_id = p_ori.id
+    LEFT JOIN matriculas m ON e.id = m.estudiante_id
+"""
+
+SQL_GROUP_BY_ESTUDIANTE = """
+    GROUP BY e.id, e.nombre, e.apellido, e.email, e.edad, e.carrera, 
+             e.año_ingreso, e.promedio, u.nombre, u.ciudad, 
+             p_uni.nombre, p_ori.nombre, p_ori.codigo
+"""
+
+# Modos de búsqueda SQL y tamaño de lote por defecto para el modo por lotes
+SQL_MODO_INDIVIDUAL = "Una consulta por estudiante"
+SQL_MODO_LOTES = "Por lotes (set-based)"
+SQL_MODO_PIPELINE = "Pipeline (psycopg 3)"
+SQL_BATCH_SIZE = 500
+
+# Tipos de coincidencia por nombre: filtro WHERE y cómo se arma el parámetro
+SQL_COINCIDENCIA_SUBCADENA = "Subcadena (ILIKE)"
+SQL_COINCIDENCIA_TRIGRAMAS = "Subcadena (trigramas)"
+SQL_COINCIDENCIA_EXACTA = "Exacta (índice)"
+SQL_FILTROS = {
+    # CONCAT ... ILIKE '%nombre%': ningún btree la resuelve, recorre toda la tabla
+    SQL_COINCIDENCIA_SUBCADENA: ("CONCAT(e.nombre, ' ', e.apellido) ILIKE %s", lambda name: f"%{name}%"),
+    # Misma expresión que idx_estudiantes_nombre_trgm (GIN pg_trgm): subcadena por índice
+    SQL_COINCIDENCIA_TRIGRAMAS: ("(e.nombre || ' ' || e.apellido) ILIKE %s", lambda name: f"%{name}%"),
+    # Misma expresión que idx_estudiantes_nombre_completo: búsqueda por índice
+    SQL_COINCIDENCIA_EXACTA: ("LOWER(e.nombre || ' ' || e.apellido) = LOWER(%s)", lambda name: name.strip()),
+}
+
+def build_sql_result(result, courses):
+    """Convierte una fila del resumen SQL y sus cursos en el diccionario que muestra la app"""
+    return {
+        'id': result[0],
+        'nombre': result[1],
+        'apellido': result[2],
+        'email': result[3],
+        'edad': result[4],
+        'carrera': result[5],
+        'año_ingreso': result[6],
+        'promedio': float(result[7]),
+        'universidad': result[8],
+        'ciudad_universidad': result[9],
+        'pais_universidad': result[10],
+        'pais_origen': result[11],
+        'codigo_pais': result[12],
+        'total_cursos': result[13],
+        'promedio_cursos': float(result[14]) if result[14] else 0,
+        'total_creditos': result[15] if result[15] else 0,
+        'cursos': [
+            {
+                'curso': c[0],
+                'semestre': c[1],
+                'nota': float(c[2]),
+                'creditos': c[3]
+            } for c in courses
+        ]
+    }
+
+def get_postgres_index_stats():
+    """Tamaño y uso de los índices de la tabla estudiantes (para evaluar su costo)"""
+    pool = get_postgres_pool()
+    if not pool:
+        return []
+
+    try:
+        with pool.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT indexrelname, pg_size_pretty(pg_relation_size(indexrelid)), idx_scan
+                FROM pg_stat_user_indexes
+                WHERE relname = 'estudiantes'
+                ORDER BY pg_relation_size(indexrelid) DESC
+            """)
+            stats = cursor.fetchall()
+            cursor.close()
+        return stats
+    except Exception:
+        return []
+
+def build_sql_search_query(filtro, una_consulta=False, resumen=False):
+    """Arma la consulta de resumen por estudiante.
+
+    Con una_consulta agrega los cursos como JSON; con resumen lee de la tabla
+    precalculada resumen_estudiantes en lugar de hacer los JOINs y el GROUP BY.
+    """
+    if resumen:
+        return (SQL_SELECT_RESUMEN + (SQL_CURSOS_JSON_RESUMEN if una_consulta else "") + f"""
+    FROM resumen_estudiantes e
+    WHERE {filtro}
+    """)
+
+    return (SQL_SELECT_ESTUDIANTE + (SQL_CURSOS_JSON if una_consulta else "") + SQL_FROM_ESTUDIANTE
+            + f"""
+    WHERE {filtro}
+    """ + SQL_GROUP_BY_ESTUDIANTE)
+
+def postgres_has_summary_table():
+    """Indica si existe la tabla resumen_estudiantes (la crean los scripts de configuración)"""
+    pool = get_postgres_pool()
+    if not pool:
+        return False
+
+    try:
+        with pool.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT to_regclass('resumen_estudiantes')")
+            exists = cursor.fetchone()[0] is not None
+            cursor.close()
+        return exists
+    except Exception:
+        return False
+
+def to_dollar_params(query):
+    """Convierte los marcadores %s de psycopg2 en $1, $2... (PREPARE y asyncpg)"""
+    partes = query.split('%s')
+    return partes[0] + ''.join(f"${i}{parte}" for i, parte in enumerate(partes[1:], 1))
+
+# Sentencias preparadas: nombre en el servidor -> descripción (el nombre sale del texto de la consulta)
+_preparadas = {}
+# Las que prepara psycopg 3 tienen nombres propios (_pg3_N): se reconocen por el texto
+# de la consulta, que es el que se envía con los marcadores $1, $2...
+_preparadas_psycopg3 = {}
+
+# Valores de plan_cache_mode (None deja el de la sesión, 'auto' por defecto)
+PLAN_CACHE_MODES = ['auto', 'force_custom_plan', 'force_generic_plan']
+
+def execute_prepared(cursor, query, params, tipos, descripcion, plan_cache_mode=None):
+    """Ejecuta `query` como sentencia preparada en la conexión del cursor.
+
+    La primera vez en cada conexión hace PREPARE (análisis y reescritura una sola
+    vez); después solo EXECUTE con los parámetros. `tipos` son los tipos SQL de
+    los parámetros, en orden. En las conexiones de psycopg 3 (modo binario) la
+    sentencia la prepara el driver a nivel de protocolo; plan_cache_mode se
+    aplica igual en los dos casos.
+    """
+    conn = cursor.connection
+    if plan_cache_mode and conn.plan_cache_mode != plan_cache_mode:
+        # set_config y no SET: psycopg 3 envía los parámetros aparte y SET no los acepta
+        cursor.execute("SELECT set_config('plan_cache_mode', %s, false)", (plan_cache_mode,))
+        conn.plan_cache_mode = plan_cache_mode
+
+    if not isinstance(conn, ConexionPostgres):
+        _preparadas_psycopg3.setdefault(to_dollar_params(query), descripcion)
+        cursor.execute(query, params, prepare=True)
+        return
+
+    nombre = 'busq_' + hashlib.md5(query.encode()).hexdigest()[:16]
+    _preparadas.setdefault(nombre, descripcion)
+
+    if nombre not in conn.preparadas:
+        cursor.execute(f"PREPARE {nombre} ({', '.join(tipos)}) AS {to_dollar_params(query)}")
+        conn.preparadas.add(nombre)
+
+    cursor.execute(f"EXECUTE {nombre} ({', '.join(['%s'] * len(params))})", params)
+
+def get_prepared_statement_stats():
+    """Uso de la caché de planes de las sentencias preparadas, sumado sobre las conexiones
+    libres del pool de psycopg2 y del de psycopg 3 (modo binario) si ya se abrió.
+
+    Lee pg_prepared_statements (generic_plans/custom_plans existen desde PostgreSQL 14).
+    Devuelve [(descripción, conexiones, planes genéricos, planes a medida)].
+    """
+    pools = [pool for pool in (get_postgres_pool(), _postgres_pool_binario) if pool]
+
+    def leer(conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT name, statement, generic_plans, custom_plans FROM pg_prepared_statements")
+            return cursor.fetchall()
+        except Exception:
+            return []
+        finally:
+            cursor.close()
+
+    totales = {}
+    for pool in pools:
+        for filas in pool.en_cada_libre(leer):
+            for nombre, sentencia, genericos, a_medida in filas:
+                descripcion = _preparadas.get(nombre) or _preparadas_psycopg3.get(sentencia)
+                if descripcion:
+                    conexiones, g, c = totales.get(descripcion, (0, 0, 0))
+                    totales[descripcion] = (conexiones + 1, g + genericos, c + a_medida)
+
+    return [(descripcion, *valores) for descripcion, valores in sorted(totales.items())]
+
+def courses_from_json(cursos):
+    """Convierte los cursos agregados con json_agg al formato de fila de matriculas"""
+    return [(c['curso'], c['semestre'], c['nota'], c['creditos']) for c in cursos]
+
+def search_student_sql(student_name, coincidencia=SQL_COINCIDENCIA_SUBCADENA, una_consulta=False, resumen=False, etapas=None,
+                       preparada=False, plan_cache_mode=None, binario=False):
+    """Busca un estudiante en PostgreSQL con múltiples JOINs.
+
+    Por defecto hace dos consultas (resumen + cursos); con una_consulta los cursos
+    vienen agregados en la misma fila y se ahorra un viaje de ida y vuelta. Con
+    resumen lee de resumen_estudiantes (SQL optimizado para lectura).
+
+    El tiempo cubre desde pedir la conexión hasta armar el diccionario. Si se pasa
+    `etapas` se le acumula el desglose por etapa y el CPU del cliente; psycopg2
+    convierte los tipos al leer (fetch), así que 'decodificar' queda incluido en 'leer'.
+    Con preparada ambas consultas se ejecutan como sentencias preparadas por conexión.
+    Con binario usa psycopg 3 y recibe los resultados en formato binario en vez de texto.
+    """
+    pool = get_postgres_pool_binario() if binario else get_postgres_pool()
+    if not pool:
+        return None, 0
+
+    crono = Cronometro()
+
+    with pool.conexion() as conn:
+        crono.marcar('conexion')
+        cursor = conn.cursor(binary=True) if binario else conn.cursor()
+
+        # Query compleja con múltiples JOINs - búsqueda por nombre completo (más lenta, realista)
+        filtro, parametro = SQL_FILTROS[coincidencia]
+        query = build_sql_search_query(filtro, una_consulta, resumen) + """
+        LIMIT 1
+        """
+
+        # Buscar por nombre completo - esto hace que SQL sea más lento debido a los JOINs
+        if preparada:
+            execute_prepared(cursor, query, (parametro(student_name),), ['text'],
+                             f"Búsqueda - {coincidencia}" + (" + cursos JSON" if una_consulta else "") + (" (resumen)" if resumen else ""),
+                             plan_cache_mode)
+        else:
+            cursor.execute(query, (parametro(student_name),))
+        crono.marcar('ejecutar')
+        result = cursor.fetchone()
+        crono.marcar('leer')
+
+        # Obtener cursos detallados
+        courses = []
+        if result and una_consulta:
+            courses = courses_from_json(result[16])
+            crono.marcar('transformar')
+        elif result:
+            cursos_query = """
+                SELECT curso, semestre, nota, creditos
+                FROM matriculas
+                WHERE estudiante_id = %s
+                ORDER BY semestre, curso
+            """
+            if preparada:
+                execute_prepared(cursor, cursos_query, (result[0],), ['integer'], "Cursos de un estudiante", plan_cache_mode)
+            else:
+                cursor.execute(cursos_query, (result[0],))
+            crono.marcar('ejecutar')
+            courses = cursor.fetchall()
+            crono.marcar('leer')
+
+        cursor.close()
+
+    crono.marcar('conexion')
+
+    data = build_sql_result(result, courses) if result else None
+    crono.marcar('transformar')
+
+    return data, crono.terminar(etapas)
+
+def search_students_sql_batch(student_names, una_consulta=False, resumen=False, etapas=None,
+                              preparada=False, plan_cache_mode=None, binario=False):
+    """Busca un lote de estudiantes en PostgreSQL con consultas set-based.
+
+    Resuelve todo el lote con dos consultas: el resumen con JOINs filtrado por
+    el arreglo de nombres completos y todas las matrículas de los estudiantes
+    encontrados (con una_consulta, solo la primera con los cursos como JSON).
+    Devuelve (resultados, tiempo) en el mismo orden de la selección; `etapas`,
+    `preparada` y `binario` funcionan igual que en search_student_sql.
+    """
+    pool = get_postgres_pool_binario() if binario else get_postgres_pool()
+    if not pool:
+        return [], 0
+
+    crono = Cronometro()
+
+    with pool.conexion() as conn:
+        crono.marcar('conexion')
+        cursor = conn.cursor(binary=True) if binario else conn.cursor()
+
+        # Coincidencia exacta contra el arreglo de nombres (la selección viene de la lista de la BD),
+        # con la misma expresión que idx_estudiantes_nombre_completo
+        nombres = [name.strip().lower() for name in student_names]
+        query = build_sql_search_query("LOWER(e.nombre || ' ' || e.apellido) = ANY(%s)", una_consulta, resumen) + """
+        ORDER BY e.id
+        """
+        if preparada:
+            execute_prepared(cursor, query, (nombres,), ['text[]'],
+                             "Lote por nombres" + (" + cursos JSON" if una_consulta else "") + (" (resumen)" if resumen else ""),
+                             plan_cache_mode)
+        else:
+            cursor.execute(query, (nombres,))
+        crono.marcar('ejecutar')
+        rows = cursor.fetchall()
+        crono.marcar('leer')
+
+        # Un estudiante por nombre, igual que el LIMIT 1 de la búsqueda individual
+        rows_by_name = {}
+        for row in rows:
+            rows_by_name.setdefault(f"{row[1]} {row[2]}".lower(), row)
+
+        # Todas las matrículas del lote en una sola pasada
+        courses_by_student = {}
+        if una_consulta:
+            for row in rows_by_name.values():
+                courses_by_student[row[0]] = courses_from_json(row[16])
+            crono.marcar('transformar')
+        elif rows_by_name:
+            crono.marcar('transformar')
+            cursos_query = """
+                SELECT estudiante_id, curso, semestre, nota, creditos
+                FROM matriculas
+                WHERE estudiante_id = ANY(%s)
+                ORDER BY estudiante_id, semestre, curso
+            """
+            ids = [row[0] for row in rows_by_name.values()]
+            if preparada:
+                execute_prepared(cursor, cursos_query, (ids,), ['integer[]'], "Cursos de un lote", plan_cache_mode)
+            else:
+                cursor.execute(cursos_query, (ids,))
+            crono.marcar('ejecutar')
+            cursos = cursor.fetchall()
+            crono.marcar('leer')
+            for c in cursos:
+                courses_by_student.setdefault(c[0], []).append(c[1:])
+
+        cursor.close()
+
+    crono.marcar('conexion')
+
+    results = []
+    for name in nombres:
+        row = rows_by_name.get(name)
+        if row:
+            results.append(build_sql_result(row, courses_by_student.get(row[0], [])))
+    crono.marcar('transformar')
+
+    return results, crono.terminar(etapas)
+
+def search_students_sql_pipeline(student_names, coincidencia=SQL_COINCIDENCIA_EXACTA, resumen=False, etapas=None, binario=False):
+    """Busca un lote de estudiantes con una consulta por nombre, en modo pipeline de psycopg 3.
+
+    Encola todas las consultas del lote sin esperar cada respuesta y luego lee los
+    resultados a medida que llegan: el servidor hace el mismo trabajo que en la
+    búsqueda individual, pero se paga un solo viaje de ida y vuelta por lote. Usa
+    la forma de una sola consulta (cursos con json_agg) para que cada nombre sea
+    una única sentencia. Devuelve (resultados, tiempo) en el orden de la selección.
+    """
+    pool = get_postgres_pool_binario()
+    if not pool:
+        return [], 0
+
+    filtro, parametro = SQL_FILTROS[coincidencia]
+    query = build_sql_search_query(filtro, True, resumen) + """
+    LIMIT 1
+    """
+
+    crono = Cronometro()
+
+    with pool.conexion() as conn:
+        crono.marcar('conexion')
+        rows = []
+        with conn.pipeline():
+            cursores = []
+            for name in student_names:
+                cursor = conn.cursor(binary=binario)
+                cursor.execute(query, (parametro(name),))
+                cursores.append(cursor)
+            crono.marcar('ejecutar')
+
+            # fetchone sincroniza el pipeline hasta esa consulta; las siguientes ya están en camino
+            for cursor in cursores:
+                rows.append(cursor.fetchone())
+                cursor.close()
+            crono.marcar('leer')
+
+    crono.marcar('conexion')
+
+    results = [build_sql_result(row, courses_from_json(row[16])) for row in rows if row]
+    crono.marcar('transformar')
+
+    return results, crono.terminar(etapas)
+
+# Modos de búsqueda NoSQL, tamaño de bloque y batch_size del cursor por defecto
+NOSQL_MODO_INDIVIDUAL = "Un find_one por estudiante"
+NOSQL_MODO_LOTES = "Por bloques ($in)"
+NOSQL_CHUNK_SIZE = 500
+NOSQL_CURSOR_BATCH_SIZE = 100
+
+# Colación del índice idx_nombre_completo (debe coincidir para que MongoDB use el índice)
+NOMBRE_COLLATION = {'locale': 'es', 'strength': 2}
+
+# Las búsquedas reciben los documentos sin decodificar (RawBSONDocument) y los decodifican
+# aparte, para medir por separado la espera del servidor y la decodificación BSON del cliente
+RAW_BSON_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+def estudiantes_raw(db):
+    """Colección estudiantes que devuelve los documentos como BSON sin decodificar"""
+    return db.estudiantes.with_options(codec_options=RAW_BSON_OPTIONS)
+
+def decodificar_documento(raw, db, lazy=False):
+    """Decodifica el documento completo, o con lazy lo deja como RawBSONDocument
+    para que build_nosql_result decodifique solo los campos que lee"""
+    if lazy:
+        return raw
+    return bson_decode(raw.raw, db.codec_options)
+
+def mongo_has_full_name_index():
+    """Indica si la colección tiene el índice de nombre_completo que usan las búsquedas"""
+    db = get_mongo_connection()
+    if db is None:
+        return False
+    try:
+        return 'idx_nombre_completo' in db.estudiantes.index_information()
+    except Exception:
+        return False
+
+def build_nosql_result(result):
+    """Convierte un documento de MongoDB en el diccionario que muestra la app.
+
+    Acepta el documento ya decodificado o un RawBSONDocument: en ese caso solo se
+    decodifican los campos que se leen aquí, y cada matrícula de 'cursos' sigue
+    sin decodificar hasta que alguien la recorra.
+    """
+    data = {
+        'id': result['id'],
+        'nombre': result['nombre'],
+        'apellido': result['apellido'],
+        'email': result['email'],
+        'edad': result['edad'],
+        'carrera': result['carrera'],
+        'año_ingreso': result['año_ingreso'],
+        'promedio': result['promedio'],
+        'universidad': result['universidad']['nombre'],
+        'ciudad_universidad': result['universidad']['ciudad'],
+        'pais_universidad': result['universidad']['pais']['nombre'],
+        'pais_origen': result['pais_origen']['nombre'],
+        'codigo_pais': result['pais_origen']['codigo'],
+    }
+    matriculas = result['matriculas']
+    data['total_cursos'] = len(matriculas)
+    data['promedio_cursos'] = sum(m['nota'] for m in matriculas) / len(matriculas) if matriculas else 0
+    data['total_creditos'] = sum(m['creditos'] for m in matriculas)
+    data['cursos'] = matriculas
+    return data
+
+def search_student_nosql(student_name, etapas=None, lazy=False):
+    """Busca un estudiante en MongoDB - Optimizado con índices.
+
+    Igual que en SQL, el tiempo incluye decodificar el documento y armar el
+    diccionario (con las sumas sobre matriculas); `etapas` recibe el desglose.
+    Con lazy la consulta y el documento recibido son los mismos, pero no se
+    decodifica entero: build_nosql_result lee del RawBSONDocument solo los campos
+    que usa (de cada matrícula, nota y créditos). 'decodificar' queda casi vacía y
+    ese costo pasa a 'transformar'.
+    """
+    db = get_mongo_connection()
+    if db is None:
+        return None, 0
+
+    collection = estudiantes_raw(db)
+    crono = Cronometro()
+
+    # Buscar por el nombre completo normalizado (índice único con colación insensible a mayúsculas)
+    # Esto maneja correctamente nombres compuestos como "Jose Miguel" o "María Dolores"
+    raw = collection.find_one(
+        {'nombre_completo': student_name.strip()},
+        collation=NOMBRE_COLLATION
+    )
+    crono.marcar('ejecutar')
+
+    result = decodificar_documento(raw, db, lazy) if raw is not None else None
+    crono.marcar('decodificar')
+
+    data = build_nosql_result(result) if result else None
+    crono.marcar('transformar')
+
+    return data, crono.terminar(etapas)
+
+def search_students_nosql_batch(student_names, cursor_batch_size=NOSQL_CURSOR_BATCH_SIZE, etapas=None, lazy=False):
+    """Busca un bloque de estudiantes en MongoDB con un solo cursor.
+
+    Filtra con `$in` sobre el índice de nombre_completo y recorre el cursor en tandas de
+    `cursor_batch_size` documentos. Devuelve (resultados, tiempo) en el mismo
+    orden de la selección; `etapas` y `lazy` funcionan igual que en search_student_nosql
+    ('ejecutar' es el find con la primera tanda, 'leer' los getMore siguientes).
+    """
+    db = get_mongo_connection()
+    if db is None:
+        return [], 0
+
+    collection = estudiantes_raw(db)
+    crono = Cronometro()
+
+    nombres = [name.strip() for name in student_names]
+    cursor = collection.find(
+        {'nombre_completo': {'$in': nombres}},
+        collation=NOMBRE_COLLATION
+    ).sort('id', 1).batch_size(cursor_batch_size)
+
+    primero = next(cursor, None)
+    crono.marcar('ejecutar')
+    raws = [primero] + list(cursor) if primero is not None else []
+    crono.marcar('leer')
+
+    docs = [decodificar_documento(raw, db, lazy) for raw in raws]
+    crono.marcar('decodificar')
+
+    # Un documento por nombre, igual que find_one en la búsqueda individual
+    docs_by_name = {}
+    for doc in docs:
+        docs_by_name.setdefault(doc['nombre_completo'].lower(), doc)
+
+    results = [build_nosql_result(docs_by_name[name.lower()]) for name in nombres if name.lower() in docs_by_name]
+    crono.marcar('transformar')
+
+    return results, crono.terminar(etapas)
+
+def _recorrer_plan_sql(nodo, nodos):
+    """Aplana el árbol de EXPLAIN (FORMAT JSON) en una lista de nodos"""
+    nodos.append({
+        'tipo': nodo.get('Node Type'),
+        'relacion': nodo.get('Relation Name'),
+        'indice': nodo.get('Index Name'),
+        'filas': nodo.get('Actual Rows'),
+        'loops': nodo.get('Actual Loops'),
+        'filas_descartadas': nodo.get('Rows Removed by Filter', 0),
+        'tiempo_ms': nodo.get('Actual Total Time'),
+    })
+    for hijo in nodo.get('Plans', []):
+        _recorrer_plan_sql(hijo, nodos)
+    return nodos
+
+def explain_student_sql(student_name, coincidencia=SQL_COINCIDENCIA_SUBCADENA, una_consulta=False, resumen=False):
+    """Captura el plan real de la consulta de búsqueda con EXPLAIN (ANALYZE, BUFFERS).
+
+    Devuelve un resumen (índices usados, recorridos secuenciales, filas, buffers)
+    junto con el plan completo en JSON, o None si PostgreSQL no está disponible.
+    """
+    pool = get_postgres_pool()
+    if not pool:
+        return None
+
+    filtro, parametro = SQL_FILTROS[coincidencia]
+    query = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + build_sql_search_query(filtro, una_consulta, resumen) + """
+    LIMIT 1
+    """
+
+    with pool.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, (parametro(student_name),))
+        explain = cursor.fetchone()[0][0]
+        cursor.close()
+
+    plan = explain['Plan']
+    nodos = _recorrer_plan_sql(plan, [])
+    return {
+        'estudiante': student_name,
+        'tiempo_planificacion_ms': explain.get('Planning Time'),
+        'tiempo_ejecucion_ms': explain.get('Execution Time'),
+        'filas': plan.get('Actual Rows'),
+        'indices': sorted({n['indice'] for n in nodos if n['indice']}),
+        'recorridos_secuenciales': sorted({n['relacion'] for n in nodos if n['tipo'] == 'Seq Scan'}),
+        'filas_descartadas': sum(n['filas_descartadas'] * (n['loops'] or 1) for n in nodos),
+        'buffers_hit': plan.get('Shared Hit Blocks', 0),
+        'buffers_read': plan.get('Shared Read Blocks', 0),
+        'nodos': nodos,
+        'plan': explain,
+    }
+
+def _etapas_plan_mongo(etapa):
+    """Lista de etapas del plan ganador de MongoDB, de la raíz a las hojas"""
+    etapas = []
+    pendientes = [etapa]
+    while pendientes:
+        actual = pendientes.pop(0)
+        etapas.append({'etapa': actual.get('stage'), 'indice': actual.get('indexName')})
+        if 'inputStage' in actual:
+            pendientes.append(actual['inputStage'])
+        pendientes.extend(actual.get('inputStages', []))
+    return etapas
+
+def explain_student_nosql(student_name):
+    """Captura explain('executionStats') del filtro que usa search_student_nosql.
+
+    Devuelve las etapas del plan ganador (IXSCAN / COLLSCAN...), claves y documentos
+    examinados y el explain completo, o None si MongoDB no está disponible.
+    """
+    db = get_mongo_connection()
+    if db is None:
+        return None
+
+    explain = db.command({
+        'explain': {
+            'find': 'estudiantes',
+            'filter': {'nombre_completo': student_name.strip()},
+            'collation': NOMBRE_COLLATION,
+            'limit': 1,
+            'singleBatch': True,
+        },
+        'verbosity': 'executionStats'
+    })
+
+    # Con el motor SBE (MongoDB 7+) el plan de consulta viene dentro de queryPlan
+    ganador = explain['queryPlanner']['winningPlan']
+    etapas = _etapas_plan_mongo(ganador.get('queryPlan', ganador))
+    stats = explain['executionStats']
+    return {
+        'estudiante': student_name,
+        'tiempo_ejecucion_ms': stats.get('executionTimeMillis'),
+        'devueltos': stats.get('nReturned'),
+        'claves_examinadas': stats.get('totalKeysExamined'),
+        'documentos_examinados': stats.get('totalDocsExamined'),
+        'etapas': etapas,
+        'indices': sorted({e['indice'] for e in etapas if e['indice']}),
+        'recorrido_completo': any(e['etapa'] == 'COLLSCAN' for e in etapas),
+        'plan': explain,
+    }
+
+def muestra_estudiantes(seleccion, tamano):
+    """Toma `tamano` estudiantes repartidos a lo largo de la selección"""
+    if len(seleccion) <= tamano:
+        return list(seleccion)
+    paso = len(seleccion) / tamano
+    return [seleccion[int(i * paso)] for i in range(tamano)]
+
+def run_searches(tasks, search_fn, concurrency=1, on_progress=None):
+    """Ejecuta search_fn sobre cada tarea con `concurrency` hilos.
+
+    search_fn devuelve (resultado, tiempo) como las funciones de búsqueda. Devuelve
+    (resultados en el orden de las tareas, latencia de cada llamada, tiempo de pared,
+    segundos desde el inicio hasta que terminó cada llamada).
+    on_progress(hechas, total) se llama siempre desde el hilo principal.
+    """
+    outputs = [None] * len(tasks)
+    latencies = [0.0] * len(tasks)
+    completions = [0.0] * len(tasks)
+
+    def run_one(task):
+        # El fin se toma en el hilo que hizo la llamada, no cuando el principal la recoge
+        return search_fn(task), time.perf_counter()
+
+    start_time = time.perf_counter()
+
+    if concurrency <= 1:
+        for i, task in enumerate(tasks):
+            (outputs[i], latencies[i]), completions[i] = run_one(task)
+            if on_progress:
+                on_progress(i + 1, len(tasks))
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(run_one, task): i for i, task in enumerate(tasks)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                (outputs[i], latencies[i]), completions[i] = future.result()
+                if on_progress:
+                    on_progress(done, len(tasks))
+
+    wall_time = time.perf_counter() - start_time
+    completions = [fin - start_time for fin in completions]
+
+    return outputs, latencies, wall_time, completions
+
+# Concurrencia por defecto (hilos) para las búsquedas "Buscar TODOS"
+SEARCH_CONCURRENCY = 1
+
+def percentil(valores_ordenados, p):
+    """Percentil p (0-100) con interpolación lineal sobre una lista ya ordenada"""
+    if not valores_ordenados:
+        return 0.0
+    pos = (len(valores_ordenados) - 1) * p / 100
+    inferior = int(pos)
+    superior = min(inferior + 1, len(valores_ordenados) - 1)
+    return valores_ordenados[inferior] + (valores_ordenados[superior] - valores_ordenados[inferior]) * (pos - inferior)
+
+def resumen_latencias(latencias):
+    """Estadísticas de una lista de latencias en segundos: total, promedio, p50/p95/p99, mínimo y máximo"""
+    ordenadas = sorted(latencias)
+    return {
+        'n': len(ordenadas),
+        'total': sum(ordenadas),
+        'promedio': sum(ordenadas) / len(ordenadas) if ordenadas else 0.0,
+        'min': ordenadas[0] if ordenadas else 0.0,
+        'p50': percentil(ordenadas, 50),
+        'p95': percentil(ordenadas, 95),
+        'p99': percentil(ordenadas, 99),
+        'max': ordenadas[-1] if ordenadas else 0.0,
+    }
+
+def histograma(valores, bins=20):
+    """Cuenta los valores en `bins` intervalos iguales; devuelve [(inicio del intervalo, cantidad)]"""
+    if not valores:
+        return []
+    minimo, maximo = min(valores), max(valores)
+    ancho = (maximo - minimo) / bins or 1.0
+    cuentas = [0] * bins
+    for v in valores:
+        cuentas[min(int((v - minimo) / ancho), bins - 1)] += 1
+    return [(minimo + i * ancho, c) for i, c in enumerate(cuentas)]
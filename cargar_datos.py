@@ -5,7 +5,11 @@ Script simplificado para cargar datos en ambas bases de datos
 import psycopg2
 from pymongo import MongoClient
 from faker import Faker
+import argparse
 import random
+from escala import ESCALA_CARGAR_DATOS, MATRICULAS_POR_ESTUDIANTE, tamanos, describir
+from setup_databases_fixed import (nombre_completo, crear_indice_nombre_completo, crear_indices_busqueda,
+                                   crear_resumen_estudiantes, copiar_filas, ajustar_secuencia)
 import sys
 
 fake = Faker(['es_ES'])
@@ -14,16 +18,24 @@ print("="*70)
 print("CARGANDO DATOS EN BASES DE DATOS")
 print("="*70)
 
-# Configuración
-NUM_PAISES = 100
-NUM_UNIVERSIDADES = 200
-NUM_ESTUDIANTES = 10000  # 10k para demostrar diferencia dramática
-CURSOS = ['Matemáticas I', 'Física I', 'Química', 'Programación', 'Estadística',
-          'Literatura', 'Historia', 'Biología', 'Inglés', 'Filosofía']
+# Configuración: las cantidades salen del factor de escala (0.4 = 10k estudiantes, para demostrar diferencia dramática)
+parser = argparse.ArgumentParser(description="Carga datos generados con Faker en PostgreSQL y MongoDB")
+parser.add_argument('--escala', type=float, default=ESCALA_CARGAR_DATOS,
+                    help="Factor de escala del dataset (1 = 25k estudiantes, ver escala.py)")
+args = parser.parse_args()
+TAMANOS = tamanos(args.escala)
+NUM_PAISES = TAMANOS['paises']
+NUM_UNIVERSIDADES = TAMANOS['universidades']
+NUM_ESTUDIANTES = TAMANOS['estudiantes']
+CURSOS_BASE = ['Matemáticas', 'Física', 'Química', 'Programación', 'Estadística',
+               'Literatura', 'Historia', 'Biología', 'Inglés', 'Filosofía']
 CARRERAS = ['Ingeniería Informática', 'Medicina', 'Derecho', 'Economía', 
             'Arquitectura', 'Psicología', 'Biología', 'Matemáticas']
 
-print(f"\nConfiguración: {NUM_ESTUDIANTES} estudiantes")
+print("\nConfiguración:")
+# Este esquema simplificado no tiene profesores ni departamentos
+for linea in describir(args.escala, TAMANOS, omitir=('departamentos', 'profesores')):
+    print(linea)
 
 # ============= POSTGRESQL =============
 print("\n📘 Configurando PostgreSQL...")
@@ -87,67 +99,63 @@ try:
     """)
     conn.commit()
     
-    # Insertar países
-    print("  - Insertando países...")
-    paises_ids = []
-    for _ in range(NUM_PAISES):
-        cursor.execute(
-            "INSERT INTO paises (nombre, codigo) VALUES (%s, %s) RETURNING id",
-            (fake.country(), fake.country_code())
-        )
-        paises_ids.append(cursor.fetchone()[0])
-    conn.commit()
-    
-    # Insertar universidades
-    print("  - Insertando universidades...")
-    universidades_ids = []
-    for _ in range(NUM_UNIVERSIDADES):
-        cursor.execute(
-            "INSERT INTO universidades (nombre, pais_id, ciudad) VALUES (%s, %s, %s) RETURNING id",
-            (f"Universidad {fake.company()}", random.choice(paises_ids), fake.city())
-        )
-        universidades_ids.append(cursor.fetchone()[0])
-    conn.commit()
-    
-    # Insertar estudiantes
-    print(f"  - Insertando {NUM_ESTUDIANTES} estudiantes...")
-    estudiantes = []
-    for i in range(NUM_ESTUDIANTES):
-        # Generar nombres ÚNICOS agregando el índice para evitar duplicados
-        nombre = f"{fake.first_name()}"
-        apellido = f"{fake.last_name()} {i+1}"  # Agregar número para garantizar unicidad
-        cursor.execute(
-            """INSERT INTO estudiantes (nombre, apellido, email, edad, universidad_id, 
-               pais_origen_id, carrera, año_ingreso, promedio) 
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id""",
-            (nombre, apellido, fake.email(), random.randint(18, 30),
-             random.choice(universidades_ids), random.choice(paises_ids),
-             random.choice(CARRERAS), random.randint(2018, 2024),
-             round(random.uniform(6.0, 9.99), 2))
-        )
-        est_id = cursor.fetchone()[0]
-        estudiantes.append({'id': est_id, 'nombre': nombre, 'apellido': apellido})
-        
-        # Matrículas
-        num_cursos = random.randint(4, 8)
-        for _ in range(num_cursos):
-            cursor.execute(
-                """INSERT INTO matriculas (estudiante_id, curso, semestre, nota, creditos)
-                   VALUES (%s, %s, %s, %s, %s)""",
-                (est_id, random.choice(CURSOS), f"2024-{random.randint(1,2)}",
-                 round(random.uniform(6.0, 9.99), 2), random.choice([3, 4, 5]))
-            )
-        
-        if (i + 1) % 100 == 0:
-            conn.commit()
-            print(f"    {i + 1} estudiantes insertados...")
-    
+    # Generar los datos con ids asignados en el cliente y cargarlos con COPY
+    print("  - Copiando datos...")
+    paises_ids = list(range(1, NUM_PAISES + 1))
+    copiar_filas(cursor, 'paises', ('id', 'nombre', 'codigo'),
+                 ((pais_id, fake.country(), fake.country_code()) for pais_id in paises_ids))
+
+    universidades_ids = list(range(1, NUM_UNIVERSIDADES + 1))
+    copiar_filas(cursor, 'universidades', ('id', 'nombre', 'pais_id', 'ciudad'),
+                 ((uni_id, f"Universidad {fake.company()}", random.choice(paises_ids), fake.city())
+                  for uni_id in universidades_ids))
+
+    # Catálogo de cursos: crece con la escala, cada curso con sus créditos
+    cursos = [(f"{CURSOS_BASE[i % len(CURSOS_BASE)]} {i // len(CURSOS_BASE) + 1}", random.choice([3, 4, 5]))
+              for i in range(TAMANOS['cursos'])]
+
+    def filas_estudiantes():
+        for est_id in range(1, NUM_ESTUDIANTES + 1):
+            # Generar nombres ÚNICOS agregando el número para evitar duplicados
+            nombre = f"{fake.first_name()}"
+            apellido = f"{fake.last_name()} {est_id}"
+            yield (est_id, nombre, apellido, fake.email(), random.randint(18, 30),
+                   random.choice(universidades_ids), random.choice(paises_ids),
+                   random.choice(CARRERAS), random.randint(2018, 2024),
+                   round(random.uniform(6.0, 9.99), 2))
+
+    # Las matrículas salen de una segunda pasada sobre los ids con su propio generador
+    # sembrado: se copian en streaming, sin acumularlas en memoria
+    semilla_matriculas = random.getrandbits(64)
+
+    def filas_matriculas():
+        rng = random.Random(semilla_matriculas)
+        matricula_id = 1
+        for est_id in range(1, NUM_ESTUDIANTES + 1):
+            # Cursos sin repetir por estudiante, como en generate_data.py
+            for curso, creditos in rng.sample(cursos, rng.randint(*MATRICULAS_POR_ESTUDIANTE)):
+                yield (matricula_id, est_id, curso,
+                       f"2024-{rng.randint(1,2)}", round(rng.uniform(6.0, 9.99), 2),
+                       creditos)
+                matricula_id += 1
+
+    copiar_filas(cursor, 'estudiantes',
+                 ('id', 'nombre', 'apellido', 'email', 'edad', 'universidad_id',
+                  'pais_origen_id', 'carrera', 'año_ingreso', 'promedio'),
+                 filas_estudiantes())
+    copiar_filas(cursor, 'matriculas', ('id', 'estudiante_id', 'curso', 'semestre', 'nota', 'creditos'),
+                 filas_matriculas())
+
+    for tabla in ('paises', 'universidades', 'estudiantes', 'matriculas'):
+        ajustar_secuencia(cursor, tabla)
     conn.commit()
     
     # Crear índices
     print("  - Creando índices...")
     cursor.execute("CREATE INDEX idx_estudiantes_nombre ON estudiantes(nombre, apellido);")
     cursor.execute("CREATE INDEX idx_matriculas_estudiante ON matriculas(estudiante_id);")
+    crear_indices_busqueda(cursor)
+    crear_resumen_estudiantes(cursor)
     conn.commit()
     
     cursor.execute("SELECT COUNT(*) FROM estudiantes")
@@ -236,7 +244,8 @@ try:
                     'nota': float(m[2]),
                     'creditos': m[3]
                 } for m in matriculas
-            ]
+            ],
+            'nombre_completo': nombre_completo(est[1], est[2])
         }
         documentos.append(doc)
     
@@ -248,6 +257,7 @@ try:
     print("  - Creando índices...")
     db.estudiantes.create_index([('nombre', 1), ('apellido', 1)])
     db.estudiantes.create_index('email')
+    crear_indice_nombre_completo(db.estudiantes)
     
     count = db.estudiantes.count_documents({})
     print(f"  ✅ {count} estudiantes en MongoDB")
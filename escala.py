@@ -0,0 +1,68 @@
+"""
+Factor de escala del dataset (al estilo del SF de TPC-H)
+Todos los scripts de carga derivan de aquí la cantidad de cada entidad
+"""
+import math
+
+# Tamaños con escala 1 (25k estudiantes, ~175k matrículas)
+ESTUDIANTES_BASE = 25000
+UNIVERSIDADES_BASE = 150
+PROFESORES_BASE = 1500
+CURSOS_BASE = 150
+
+# No crecen con la escala: hay una cantidad limitada de países reales y de áreas académicas
+NUM_PAISES = 80
+NUM_DEPARTAMENTOS = 40
+
+# Cursos por estudiante (uniforme entre ambos valores, sin repetir curso)
+MATRICULAS_POR_ESTUDIANTE = (4, 10)
+
+# Escalas de referencia de cada script
+ESCALA_GENERATE_DATA = 1.0    # 25k estudiantes
+ESCALA_CARGAR_DATOS = 0.4     # 10k estudiantes
+ESCALA_QUICK_SETUP = 0.04     # 1k estudiantes
+
+def tamanos(escala=1.0):
+    """Cantidad de cada entidad para un factor de escala.
+
+    Estudiantes y matrículas crecen linealmente con la escala. Universidades,
+    profesores y cursos crecen con su raíz cuadrada, para que una escala 400
+    (10M de estudiantes, ~70M de matrículas) siga teniendo catálogos de un tamaño
+    razonable y la proporción estudiantes por universidad aumente como en un
+    sistema real. Países y departamentos son fijos.
+    """
+    if escala <= 0:
+        raise ValueError("La escala debe ser mayor que 0")
+
+    raiz = math.sqrt(escala)
+    minimo, maximo = MATRICULAS_POR_ESTUDIANTE
+    estudiantes = max(1, round(ESTUDIANTES_BASE * escala))
+    return {
+        'paises': NUM_PAISES,
+        'universidades': max(1, round(UNIVERSIDADES_BASE * raiz)),
+        'departamentos': NUM_DEPARTAMENTOS,
+        'profesores': max(1, round(PROFESORES_BASE * raiz)),
+        # Siempre alcanzan para elegir el máximo de cursos sin repetir
+        'cursos': max(maximo, round(CURSOS_BASE * raiz)),
+        'estudiantes': estudiantes,
+        'matriculas_min': minimo,
+        'matriculas_max': maximo,
+        'matriculas_estimadas': round(estudiantes * (minimo + maximo) / 2),
+    }
+
+def describir(escala, t, omitir=()):
+    """Líneas de resumen de los tamaños, para mostrar antes de generar o cargar.
+
+    `omitir` son las entidades que el script no carga (por ejemplo 'profesores').
+    """
+    lineas = [
+        (None, f"- Escala {escala:g}"),
+        ('paises', f"- {t['paises']:,} países"),
+        ('universidades', f"- {t['universidades']:,} universidades"),
+        ('departamentos', f"- {t['departamentos']:,} departamentos"),
+        ('profesores', f"- {t['profesores']:,} profesores"),
+        ('cursos', f"- {t['cursos']:,} cursos en catálogo"),
+        ('estudiantes', f"- {t['estudiantes']:,} estudiantes"),
+        ('matriculas', f"- ~{t['matriculas_estimadas']:,} matrículas ({t['matriculas_min']}-{t['matriculas_max']} por estudiante, sin repetir curso)"),
+    ]
+    return [linea for entidad, linea in lineas if entidad not in omitir]
@@ -1,25 +1,87 @@
 """
 Script para generar datos masivos para demostración SQL vs NoSQL
 """
+import argparse
+import csv
+import functools
+import hashlib
+import io
+import itertools
+import multiprocessing
+import os
 import random
+import re
+import sys
+import time
+import unicodedata
+from collections import deque
+from contextlib import ExitStack
 from faker import Faker
 import json
 
+from escala import ESCALA_GENERATE_DATA, MATRICULAS_POR_ESTUDIANTE, tamanos, describir
+from tabla_columnar import TEXTO, TablaColumnar
+
+# resource no existe en Windows: sin él no se informa la memoria máxima
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# NumPy es opcional: solo lo necesita el modo --rapido
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 fake = Faker(['es_ES', 'en_US', 'fr_FR', 'de_DE', 'it_IT'])
 
 # Configuración - OPTIMIZADO para demostrar diferencia SQL vs NoSQL
-# 25k estudiantes son suficientes para ver la diferencia de rendimiento
-NUM_ESTUDIANTES = 25000  
-NUM_UNIVERSIDADES = 150
-NUM_PAISES = 80
-NUM_DEPARTAMENTOS = 40
-NUM_PROFESORES = 1500
-NUM_CURSOS_CATALOGO = 150
-
-def generate_countries():
+# Las cantidades salen del factor de escala (escala.py): con 1, 25k estudiantes,
+# suficientes para ver la diferencia de rendimiento
+
+# Estudiantes por bloque: se generan, se escriben y se descartan (la memoria no depende de la escala)
+CHUNK_ESTUDIANTES = 5000
+
+CARRERAS = ['Ingeniería', 'Medicina', 'Derecho', 'Psicología', 'Arquitectura',
+            'Economía', 'Biología', 'Física', 'Química', 'Matemáticas']
+
+# Estudiantes y matrículas se guardan por columnas (tabla_columnar.py): enteros y
+# decimales en arrays tipados, textos internados. El email no se guarda, se arma al escribir.
+ESQUEMA_ESTUDIANTES = [
+    ('id', 'q'), ('nombre', TEXTO), ('apellido', TEXTO), ('dominio', TEXTO), ('edad', 'b'),
+    ('universidad_id', 'i'), ('pais_origen_id', 'i'), ('carrera', TEXTO), ('año_ingreso', 'h'),
+    ('promedio', 'd'),
+]
+ESQUEMA_MATRICULAS = [
+    ('id', 'q'), ('estudiante_id', 'q'), ('curso_id', 'i'), ('semestre', 'b'), ('nota', 'd'), ('año', 'h'),
+]
+
+@functools.lru_cache(maxsize=1 << 16)
+def slug_email(texto):
+    """Parte local de email: sin acentos ni espacios, palabras unidas con '-' ("Pérez 2" -> "perez-2")"""
+    ascii = unicodedata.normalize('NFKD', texto.casefold()).encode('ascii', 'ignore').decode('ascii')
+    return '-'.join(re.findall(r'[a-z0-9]+', ascii))
+
+def email_estudiante(nombre, apellido, dominio):
+    return f"{slug_email(nombre)}.{slug_email(apellido)}@{dominio}"
+
+def nueva_tabla_estudiantes():
+    return TablaColumnar(ESQUEMA_ESTUDIANTES, {'email': (email_estudiante, ('nombre', 'apellido', 'dominio'))})
+
+def nueva_tabla_matriculas():
+    return TablaColumnar(ESQUEMA_MATRICULAS)
+
+# Valores de Faker precalculados una vez. Los nombres y apellidos se combinan sin repetir
+# (ver unique_names); los dominios se muestrean con repetición en el modo --rapido.
+POOL_NOMBRES = 5000
+POOL_APELLIDOS = 5000
+POOL_DOMINIOS = 1000
+
+def generate_countries(num_paises):
     """Genera lista de países"""
     countries = []
-    for i in range(NUM_PAISES):
+    for i in range(num_paises):
         countries.append({
             'id': i + 1,
             'nombre': fake.country(),
@@ -27,10 +89,10 @@ def generate_countries():
         })
     return countries
 
-def generate_universities(countries):
+def generate_universities(countries, num_universidades):
     """Genera lista de universidades"""
     universities = []
-    for i in range(NUM_UNIVERSIDADES):
+    for i in range(num_universidades):
         universities.append({
             'id': i + 1,
             'nombre': f"Universidad {fake.company()}",
@@ -39,12 +101,12 @@ def generate_universities(countries):
         })
     return universities
 
-def generate_departments():
+def generate_departments(num_departamentos):
     """Genera lista de departamentos académicos"""
     dept_names = ['Ingeniería', 'Ciencias', 'Humanidades', 'Medicina', 'Derecho',
                   'Economía', 'Arquitectura', 'Artes', 'Comunicación', 'Educación']
     departments = []
-    for i in range(NUM_DEPARTAMENTOS):
+    for i in range(num_departamentos):
         departments.append({
             'id': i + 1,
             'nombre': f"Departamento de {random.choice(dept_names)} {i+1}",
@@ -52,10 +114,10 @@ def generate_departments():
         })
     return departments
 
-def generate_professors(departments):
+def generate_professors(departments, num_profesores):
     """Genera lista de profesores"""
     professors = []
-    for i in range(NUM_PROFESORES):
+    for i in range(num_profesores):
         professors.append({
             'id': i + 1,
             'nombre': fake.first_name(),
@@ -66,14 +128,14 @@ def generate_professors(departments):
         })
     return professors
 
-def generate_course_catalog(departments, professors):
+def generate_course_catalog(departments, professors, num_cursos):
     """Genera catálogo de cursos disponibles"""
     cursos_base = ['Matemáticas', 'Física', 'Química', 'Programación', 'Cálculo',
                    'Álgebra', 'Base de Datos', 'Redes', 'Algoritmos', 'Historia',
                    'Literatura', 'Biología', 'Estadística', 'Economía', 'Filosofía']
     
     courses = []
-    for i in range(NUM_CURSOS_CATALOGO):
+    for i in range(num_cursos):
         courses.append({
             'id': i + 1,
             'codigo': f"CURSO{i+1:04d}",
@@ -84,43 +146,141 @@ def generate_course_catalog(departments, professors):
         })
     return courses
 
-def generate_students(universities, countries):
-    """Genera lista de estudiantes"""
-    students = []
-    carreras = ['Ingeniería', 'Medicina', 'Derecho', 'Psicología', 'Arquitectura',
-                'Economía', 'Biología', 'Física', 'Química', 'Matemáticas']
-
-    for i in range(NUM_ESTUDIANTES):
-        nombre = fake.first_name()
-        apellido = fake.last_name()
-        students.append({
+# Rondas de la permutación de combinaciones nombre-apellido
+RONDAS_PERMUTACION = 4
+
+@functools.lru_cache(maxsize=None)
+def claves_permutacion(semilla, vuelta):
+    """Claves de 32 bits de las rondas de la permutación de una vuelta"""
+    return tuple(seed_for_chunk(semilla, f"nombres:{vuelta}:{ronda}") & 0xFFFFFFFF
+                 for ronda in range(RONDAS_PERMUTACION))
+
+def _mezclar(valor, clave):
+    """Función de ronda: valor < 2**31 y clave < 2**32, así los productos entran en 64 bits"""
+    z = ((valor ^ clave) * 0x45d9f3b) & 0xFFFFFFFF
+    z = ((z ^ (z >> 16)) * 0x45d9f3b) & 0xFFFFFFFF
+    return z ^ (z >> 16)
+
+def permutar_combinaciones(posiciones, total, claves):
+    """Permutación pseudoaleatoria de [0, total) aplicada a `posiciones`.
+
+    Es una red de Feistel sobre el menor dominio de 2**(2*bits) que cubre total,
+    y los valores que caen fuera se vuelven a permutar hasta entrar. Acepta un
+    entero o un arreglo int64 de NumPy, con el mismo resultado.
+    """
+    bits = max(1, ((total - 1).bit_length() + 1) // 2)
+    mascara = (1 << bits) - 1
+
+    def feistel(x):
+        izquierda, derecha = x >> bits, x & mascara
+        for clave in claves:
+            izquierda, derecha = derecha, izquierda ^ (_mezclar(derecha, clave) & mascara)
+        return (izquierda << bits) | derecha
+
+    x = feistel(posiciones)
+    if isinstance(x, int):
+        while x >= total:
+            x = feistel(x)
+        return x
+    fuera = x >= total
+    while fuera.any():
+        x[fuera] = feistel(x[fuera])
+        fuera = x >= total
+    return x
+
+def apellido_en_vuelta(apellido, vuelta):
+    """Apellido con el número de vuelta a partir de la segunda (ver unique_names)"""
+    return apellido if vuelta == 0 else f"{apellido} {vuelta + 1}"
+
+def unique_names(pools, semilla, ids):
+    """Nombres y apellidos de los estudiantes `ids`, distintos por construcción.
+
+    Cada id corresponde a una combinación distinta de nombre y apellido de los
+    pools, elegida por una permutación pseudoaleatoria que solo depende de la
+    semilla: no hace falta recordar los nombres ya usados, así que la memoria no
+    crece con la cantidad de estudiantes. Si hay más estudiantes que
+    combinaciones, cada vuelta completa agrega su número al apellido ("Pérez 2").
+    `ids` es un entero (devuelve un par) o un arreglo de NumPy (devuelve dos listas).
+    """
+    nombres, apellidos = pools['nombres'], pools['apellidos']
+    total = len(nombres) * len(apellidos)
+    if isinstance(ids, int):
+        vuelta, posicion = divmod(ids - 1, total)
+        combinacion = permutar_combinaciones(posicion, total, claves_permutacion(semilla, vuelta))
+        nombre, apellido = divmod(combinacion, len(apellidos))
+        return nombres[nombre], apellido_en_vuelta(apellidos[apellido], vuelta)
+
+    vueltas, posiciones = np.divmod(ids - 1, total)
+    combinaciones = np.empty_like(posiciones)
+    for vuelta in np.unique(vueltas).tolist():
+        en_vuelta = vueltas == vuelta
+        combinaciones[en_vuelta] = permutar_combinaciones(posiciones[en_vuelta], total, claves_permutacion(semilla, vuelta))
+    indices_nombres, indices_apellidos = np.divmod(combinaciones, len(apellidos))
+    return ([nombres[i] for i in indices_nombres.tolist()],
+            [apellido_en_vuelta(apellidos[i], v) for i, v in zip(indices_apellidos.tolist(), vueltas.tolist())])
+
+def generate_students(universities, countries, pools, semilla, start_id, count):
+    """Genera un bloque de `count` estudiantes con ids consecutivos desde start_id"""
+    students = nueva_tabla_estudiantes()
+
+    for i in range(start_id - 1, start_id - 1 + count):
+        nombre, apellido = unique_names(pools, semilla, i + 1)
+        students.agregar({
             'id': i + 1,
             'nombre': nombre,
             'apellido': apellido,
-            'email': f"{nombre.lower()}.{apellido.lower()}@{fake.domain_name()}",
+            'dominio': fake.domain_name(),
             'edad': random.randint(18, 35),
             'universidad_id': random.choice(universities)['id'],
             'pais_origen_id': random.choice(countries)['id'],
-            'carrera': random.choice(carreras),
+            'carrera': random.choice(CARRERAS),
             'año_ingreso': random.randint(2015, 2024),
             'promedio': round(random.uniform(2.5, 5.0), 2)
         })
     return students
 
-def generate_enrollment(students, courses):
-    """Genera matrículas/cursos - ahora vinculadas al catálogo"""
-    enrollments = []
+def make_names_unique(students, claves, nombres_usados):
+    """Agrega el id al apellido de los estudiantes cuyo nombre completo ya salió.
+
+    Los nombres completos deben ser únicos (índice único de nombre_completo en
+    MongoDB). Se aplica en orden de id sobre todos los bloques, así el resultado
+    no depende de qué proceso generó cada bloque. `claves` son los hashes de los
+    nombres del bloque, ya calculados por el proceso que lo generó. Devuelve las
+    filas renombradas, que hay que volver a formatear.
+    """
+    nuevas = set(claves)
+    if len(nuevas) == len(claves) and nombres_usados.isdisjoint(nuevas):
+        # Caso común: ningún nombre repetido, se registran todos de una vez
+        nombres_usados |= nuevas
+        return []
+
+    renombradas = []
+    ids = students.columnas['id']
+    for i, clave in enumerate(claves):
+        if clave not in nombres_usados:
+            nombres_usados.add(clave)
+            continue
+        # El email se deriva del apellido al formatear, así que queda actualizado solo
+        apellido = f"{students.valor('apellido', i)} {ids[i]}"
+        students.cambiar('apellido', i, apellido)
+        nombre_ya_usado(students.valor('nombre', i), apellido, nombres_usados)
+        renombradas.append(i)
+    return renombradas
+
+def generate_enrollment(students, courses, start_id=1):
+    """Genera matrículas/cursos de un bloque de estudiantes - vinculadas al catálogo"""
+    enrollments = nueva_tabla_matriculas()
     
-    enrollment_id = 1
-    for student in students:
+    enrollment_id = start_id
+    for student_id in students.columnas['id']:
         # Cada estudiante tiene entre 4 y 10 cursos del catálogo
-        num_cursos = random.randint(4, 10)
+        num_cursos = random.randint(*MATRICULAS_POR_ESTUDIANTE)
         cursos_seleccionados = random.sample(courses, min(num_cursos, len(courses)))
         
         for curso in cursos_seleccionados:
-            enrollments.append({
+            enrollments.agregar({
                 'id': enrollment_id,
-                'estudiante_id': student['id'],
+                'estudiante_id': student_id,
                 'curso_id': curso['id'],  # Ahora referencia al catálogo
                 'semestre': random.randint(1, 10),
                 'nota': round(random.uniform(2.0, 5.0), 2),
@@ -130,164 +290,476 @@ def generate_enrollment(students, courses):
     
     return enrollments
 
+def valores_distintos(valores):
+    """Valores sin repetir (sin distinguir mayúsculas, como el índice de nombre_completo), en orden"""
+    vistos = set()
+    return [v for v in valores if not (v.casefold() in vistos or vistos.add(v.casefold()))]
+
+def generate_pools():
+    """Pools de nombres, apellidos y dominios (una sola pasada de Faker).
+
+    Nombres y apellidos quedan sin repetir, para que cada combinación de
+    unique_names dé un nombre completo distinto. Se descartan además los nombres
+    compuestos que empiezan con otro nombre del pool ("Ana María" si está "Ana"):
+    con ellos "Ana María" + "López" y "Ana" + "María López" coincidirían.
+    """
+    nombres = valores_distintos(fake.first_name() for _ in range(POOL_NOMBRES))
+    prefijos = {n.casefold() for n in nombres}
+    nombres = [n for n in nombres
+               if not any(' '.join(n.casefold().split(' ')[:k]) in prefijos for k in range(1, n.count(' ') + 1))]
+    return {
+        'nombres': nombres,
+        'apellidos': valores_distintos(fake.last_name() for _ in range(POOL_APELLIDOS)),
+        'dominios': [fake.domain_name() for _ in range(POOL_DOMINIOS)],
+    }
+
+def sample_without_replacement(rng, filas, poblacion, k):
+    """Matriz (filas, k) de índices en [0, poblacion) sin repetir dentro de cada fila.
+
+    Equivale a random.sample por fila pero en k pasadas vectorizadas: el j-ésimo
+    valor se elige entre los poblacion - j que quedan y se corre sobre los ya
+    elegidos (recorridos de menor a mayor) para saltearlos.
+    """
+    elegidos = np.empty((filas, k), dtype=np.int64)
+    for j in range(k):
+        r = rng.integers(0, poblacion - j, filas)
+        for previo in np.sort(elegidos[:, :j], axis=1).T:
+            r += r >= previo
+        elegidos[:, j] = r
+    return elegidos
+
+def generate_chunk_vectorized(pools, universities, countries, courses, semilla, seed, start_id, count):
+    """Versión vectorizada de generate_students + generate_enrollment para un bloque.
+
+    Cada columna se saca de una vez con NumPy, con las mismas distribuciones que
+    la versión fila a fila (enteros y elecciones uniformes, notas redondeadas a 2
+    decimales, cursos sin repetir por estudiante).
+    """
+    rng = np.random.default_rng(seed)
+
+    # Estudiantes: cada columna va directo a su array (mismo orden de sorteos que antes)
+    ids = np.arange(start_id, start_id + count)
+    students = nueva_tabla_estudiantes()
+    students.extender('id', ids)
+    nombres, apellidos = unique_names(pools, semilla, ids)
+    students.extender('nombre', nombres)
+    students.extender('apellido', apellidos)
+    dominios = pools['dominios']
+    students.extender('dominio', (dominios[i] for i in rng.integers(0, len(dominios), count).tolist()))
+    universidad_ids = np.array([u['id'] for u in universities])[rng.integers(0, len(universities), count)]
+    pais_ids = np.array([c['id'] for c in countries])[rng.integers(0, len(countries), count)]
+    carreras = np.array(CARRERAS, dtype=object)[rng.integers(0, len(CARRERAS), count)]
+    students.extender('edad', rng.integers(18, 36, count))
+    students.extender('universidad_id', universidad_ids)
+    students.extender('pais_origen_id', pais_ids)
+    students.extender('carrera', carreras)
+    students.extender('año_ingreso', rng.integers(2015, 2025, count))
+    students.extender('promedio', np.round(rng.uniform(2.5, 5.0, count), 2))
+
+    # Matrículas: cantidad por estudiante, cursos sin repetir y luego las columnas de todas juntas
+    minimo, maximo = MATRICULAS_POR_ESTUDIANTE
+    por_estudiante = min(maximo, len(courses))
+    cantidades = np.minimum(rng.integers(minimo, maximo + 1, count), por_estudiante)
+    elegidos = sample_without_replacement(rng, count, len(courses), por_estudiante)
+    usados = np.arange(por_estudiante) < cantidades[:, None]
+    total = int(cantidades.sum())
+
+    enrollments = nueva_tabla_matriculas()
+    enrollments.extender('id', np.arange(1, total + 1))
+    enrollments.extender('estudiante_id', np.repeat(ids, cantidades))
+    enrollments.extender('curso_id', np.array([c['id'] for c in courses])[elegidos[usados]])
+    enrollments.extender('semestre', rng.integers(1, 11, total))
+    enrollments.extender('nota', np.round(rng.uniform(2.0, 5.0, total), 2))
+    enrollments.extender('año', rng.integers(2020, 2025, total))
+    return students, enrollments
+
+def seed_for_chunk(semilla, indice):
+    """Semilla del bloque `indice`: depende solo de la semilla global y del bloque"""
+    return int.from_bytes(hashlib.blake2b(f"{semilla}:{indice}".encode('utf-8'), digest_size=8).digest(), 'little')
+
+# Catálogos, formatos de salida, pools y modo que necesita cada proceso,
+# cargados una sola vez por el inicializador del pool
+_worker_catalogs = None
+_worker_formatos = None
+_worker_pools = None
+_worker_rapido = False
+
+def _init_worker(universities, countries, courses, catalogs, formatos, pools, rapido=False):
+    global _worker_catalogs, _worker_formatos, _worker_pools, _worker_rapido
+    _worker_catalogs = (universities, countries, courses, catalogs)
+    _worker_formatos = formatos
+    _worker_pools = pools
+    _worker_rapido = rapido
+
+def generate_chunk(semilla, indice, start_id, count):
+    """Genera y formatea un bloque completo con su propia semilla (se ejecuta en un proceso del pool).
+
+    Devuelve las líneas de salida ya formateadas (ver format_chunk): al proceso
+    principal solo le queda numerar las matrículas y escribir.
+    """
+    universities, countries, courses, catalogs = _worker_catalogs
+    seed = seed_for_chunk(semilla, indice)
+    if _worker_rapido:
+        students, enrollments = generate_chunk_vectorized(_worker_pools, universities, countries, courses,
+                                                          semilla, seed, start_id, count)
+    else:
+        random.seed(seed)
+        fake.seed_instance(seed)
+        students = generate_students(universities, countries, _worker_pools, semilla, start_id, count)
+        enrollments = generate_enrollment(students, courses)
+
+    return format_chunk(students, enrollments, catalogs, *_worker_formatos)
+
+def generate_student_chunks(universities, countries, courses, catalogs, formatos, num_estudiantes, semilla,
+                            pools, procesos=1, rapido=False):
+    """Genera y formatea estudiantes y sus matrículas de a bloques de CHUNK_ESTUDIANTES.
+
+    Cada bloque cubre un rango fijo de ids y tiene su propia semilla, así que el
+    resultado es el mismo con cualquier cantidad de procesos. Los bloques se
+    generan y formatean en paralelo (a lo sumo 2 por proceso en vuelo, para
+    acotar la memoria) y se entregan en orden: se escriben y se descartan antes
+    de pedir más. Los nombres son únicos por construcción (unique_names), así
+    que aquí solo se asigna el primer id de matrícula de cada bloque. Con
+    `rapido` cada bloque se genera vectorizado con NumPy.
+    """
+    bloques = [(semilla, indice, start + 1, min(CHUNK_ESTUDIANTES, num_estudiantes - start))
+               for indice, start in enumerate(range(0, num_estudiantes, CHUNK_ESTUDIANTES))]
+    enrollment_id = 1
+
+    def unir(bloque):
+        nonlocal enrollment_id
+        bloque['primera_matricula'] = enrollment_id
+        enrollment_id += len(bloque['filas_matriculas'])
+        return bloque
+
+    initargs = (universities, countries, courses, catalogs, formatos, pools, rapido)
+    if procesos <= 1:
+        _init_worker(*initargs)
+        for bloque in bloques:
+            yield unir(generate_chunk(*bloque))
+        return
+
+    with multiprocessing.Pool(procesos, initializer=_init_worker, initargs=initargs) as pool:
+        pendientes = deque()
+        siguientes = iter(bloques)
+        for bloque in itertools.islice(siguientes, 2 * procesos):
+            pendientes.append(pool.apply_async(generate_chunk, bloque))
+        while pendientes:
+            resultado = pendientes.popleft().get()
+            bloque = next(siguientes, None)
+            if bloque is not None:
+                pendientes.append(pool.apply_async(generate_chunk, bloque))
+            yield unir(resultado)
+        # Esperar a que terminen los procesos, así su memoria queda en RUSAGE_CHILDREN
+        pool.close()
+        pool.join()
+
 def escape_sql_string(s):
     """Escapa comillas simples para SQL"""
     return s.replace("'", "''")
 
-def save_sql_data(countries, universities, students, enrollments, departments, professors, courses):
-    """Guarda datos en formato SQL - ESTRUCTURA COMPLEJA CON MUCHOS JOINS"""
-    with open('data_sql.sql', 'w', encoding='utf-8') as f:
-        # Crear tablas
-        f.write("""
--- Crear base de datos
-CREATE DATABASE IF NOT EXISTS universidad_db;
-
--- Eliminar tablas existentes
-DROP TABLE IF EXISTS matriculas CASCADE;
-DROP TABLE IF EXISTS cursos_catalogo CASCADE;
-DROP TABLE IF EXISTS profesores CASCADE;
-DROP TABLE IF EXISTS departamentos CASCADE;
-DROP TABLE IF EXISTS estudiantes CASCADE;
-DROP TABLE IF EXISTS universidades CASCADE;
-DROP TABLE IF EXISTS paises CASCADE;
-
--- Tabla de países
-CREATE TABLE paises (
-    id SERIAL PRIMARY KEY,
-    nombre VARCHAR(100) NOT NULL,
-    codigo VARCHAR(3) NOT NULL
-);
-
--- Tabla de universidades
-CREATE TABLE universidades (
-    id SERIAL PRIMARY KEY,
-    nombre VARCHAR(200) NOT NULL,
-    pais_id INTEGER REFERENCES paises(id),
-    ciudad VARCHAR(100) NOT NULL
-);
-
--- Tabla de departamentos
-CREATE TABLE departamentos (
-    id SERIAL PRIMARY KEY,
-    nombre VARCHAR(200) NOT NULL,
-    presupuesto INTEGER NOT NULL
-);
-
--- Tabla de profesores
-CREATE TABLE profesores (
-    id SERIAL PRIMARY KEY,
-    nombre VARCHAR(100) NOT NULL,
-    apellido VARCHAR(100) NOT NULL,
-    email VARCHAR(200) NOT NULL,
-    departamento_id INTEGER REFERENCES departamentos(id),
-    años_experiencia INTEGER NOT NULL
-);
-
--- Catálogo de cursos
-CREATE TABLE cursos_catalogo (
-    id SERIAL PRIMARY KEY,
-    codigo VARCHAR(20) NOT NULL,
-    nombre VARCHAR(200) NOT NULL,
-    creditos INTEGER NOT NULL,
-    departamento_id INTEGER REFERENCES departamentos(id),
-    profesor_id INTEGER REFERENCES profesores(id)
-);
-
--- Tabla de estudiantes
-CREATE TABLE estudiantes (
-    id SERIAL PRIMARY KEY,
-    nombre VARCHAR(100) NOT NULL,
-    apellido VARCHAR(100) NOT NULL,
-    email VARCHAR(200) NOT NULL,
-    edad INTEGER NOT NULL,
-    universidad_id INTEGER REFERENCES universidades(id),
-    pais_origen_id INTEGER REFERENCES paises(id),
-    carrera VARCHAR(100) NOT NULL,
-    año_ingreso INTEGER NOT NULL,
-    promedio DECIMAL(3,2) NOT NULL
-);
-
--- Tabla de matrículas (vincula estudiantes con cursos del catálogo)
-CREATE TABLE matriculas (
-    id SERIAL PRIMARY KEY,
-    estudiante_id INTEGER REFERENCES estudiantes(id),
-    curso_id INTEGER REFERENCES cursos_catalogo(id),
-    semestre INTEGER NOT NULL,
-    nota DECIMAL(3,2) NOT NULL,
-    año INTEGER NOT NULL
-);
-
--- Insertar países
-""")
-
-        for country in countries:
-            nombre = escape_sql_string(country['nombre'])
-            f.write(f"INSERT INTO paises (id, nombre, codigo) VALUES ({country['id']}, '{nombre}', '{country['codigo']}');\n")
-
-        f.write("\n-- Insertar universidades\n")
-        for uni in universities:
-            nombre = escape_sql_string(uni['nombre'])
-            ciudad = escape_sql_string(uni['ciudad'])
-            f.write(f"INSERT INTO universidades (id, nombre, pais_id, ciudad) VALUES ({uni['id']}, '{nombre}', {uni['pais_id']}, '{ciudad}');\n")
-
-        f.write("\n-- Insertar departamentos\n")
-        for dept in departments:
-            nombre = escape_sql_string(dept['nombre'])
-            f.write(f"INSERT INTO departamentos (id, nombre, presupuesto) VALUES ({dept['id']}, '{nombre}', {dept['presupuesto']});\n")
-
-        f.write("\n-- Insertar profesores\n")
-        for prof in professors:
-            nombre = escape_sql_string(prof['nombre'])
-            apellido = escape_sql_string(prof['apellido'])
-            f.write(f"INSERT INTO profesores (id, nombre, apellido, email, departamento_id, años_experiencia) VALUES ({prof['id']}, '{nombre}', '{apellido}', '{prof['email']}', {prof['departamento_id']}, {prof['años_experiencia']});\n")
-
-        f.write("\n-- Insertar catálogo de cursos\n")
-        for curso in courses:
-            nombre = escape_sql_string(curso['nombre'])
-            f.write(f"INSERT INTO cursos_catalogo (id, codigo, nombre, creditos, departamento_id, profesor_id) VALUES ({curso['id']}, '{curso['codigo']}', '{nombre}', {curso['creditos']}, {curso['departamento_id']}, {curso['profesor_id']});\n")
-
-        f.write("\n-- Insertar estudiantes (en lotes para velocidad)\n")
-        batch_size = 1000
-        for i in range(0, len(students), batch_size):
-            batch = students[i:i+batch_size]
-            for student in batch:
-                nombre = escape_sql_string(student['nombre'])
-                apellido = escape_sql_string(student['apellido'])
-                carrera = escape_sql_string(student['carrera'])
-                f.write(f"INSERT INTO estudiantes (id, nombre, apellido, email, edad, universidad_id, pais_origen_id, carrera, año_ingreso, promedio) VALUES ({student['id']}, '{nombre}', '{apellido}', '{student['email']}', {student['edad']}, {student['universidad_id']}, {student['pais_origen_id']}, '{carrera}', {student['año_ingreso']}, {student['promedio']});\n")
-            if (i + batch_size) % 5000 == 0:
-                print(f"  {i + batch_size} estudiantes escritos...")
-
-        f.write("\n-- Insertar matrículas (en lotes para velocidad)\n")
-        for i in range(0, len(enrollments), batch_size):
-            batch = enrollments[i:i+batch_size]
-            for enrollment in batch:
-                f.write(f"INSERT INTO matriculas (id, estudiante_id, curso_id, semestre, nota, año) VALUES ({enrollment['id']}, {enrollment['estudiante_id']}, {enrollment['curso_id']}, {enrollment['semestre']}, {enrollment['nota']}, {enrollment['año']});\n")
-            if (i + batch_size) % 10000 == 0:
-                print(f"  {i + batch_size} matrículas escritas...")
-
-        f.write("\n-- Crear índices para mejorar rendimiento (pero aún así SQL será más lento)\n")
-        f.write("CREATE INDEX idx_estudiantes_nombre ON estudiantes(nombre, apellido);\n")
-        f.write("CREATE INDEX idx_matriculas_estudiante ON matriculas(estudiante_id);\n")
-        f.write("CREATE INDEX idx_matriculas_curso ON matriculas(curso_id);\n")
-        f.write("CREATE INDEX idx_profesores_departamento ON profesores(departamento_id);\n")
-        f.write("CREATE INDEX idx_cursos_departamento ON cursos_catalogo(departamento_id);\n")
-
-    print(f"✓ Archivo SQL generado: data_sql.sql")
-
-
-def save_nosql_data(countries, universities, students, enrollments, departments, professors, courses):
-    """Guarda datos en formato NoSQL (MongoDB) - TODO EN UN DOCUMENTO"""
-    # Crear diccionarios para búsqueda rápida
-    countries_dict = {c['id']: c for c in countries}
-    universities_dict = {u['id']: u for u in universities}
-    departments_dict = {d['id']: d for d in departments}
-    professors_dict = {p['id']: p for p in professors}
-    courses_dict = {c['id']: c for c in courses}
-
-    # Crear diccionario de matrículas por estudiante
+# Esquema relacional: (tabla, comentario, columnas sin el id). Todas usan id SERIAL como clave primaria.
+ESQUEMA = [
+    ('paises', 'Tabla de países', [
+        ('nombre', 'VARCHAR(100) NOT NULL'),
+        ('codigo', 'VARCHAR(3) NOT NULL'),
+    ]),
+    ('universidades', 'Tabla de universidades', [
+        ('nombre', 'VARCHAR(200) NOT NULL'),
+        ('pais_id', 'INTEGER'),
+        ('ciudad', 'VARCHAR(100) NOT NULL'),
+    ]),
+    ('departamentos', 'Tabla de departamentos', [
+        ('nombre', 'VARCHAR(200) NOT NULL'),
+        ('presupuesto', 'INTEGER NOT NULL'),
+    ]),
+    ('profesores', 'Tabla de profesores', [
+        ('nombre', 'VARCHAR(100) NOT NULL'),
+        ('apellido', 'VARCHAR(100) NOT NULL'),
+        ('email', 'VARCHAR(200) NOT NULL'),
+        ('departamento_id', 'INTEGER'),
+        ('años_experiencia', 'INTEGER NOT NULL'),
+    ]),
+    ('cursos_catalogo', 'Catálogo de cursos', [
+        ('codigo', 'VARCHAR(20) NOT NULL'),
+        ('nombre', 'VARCHAR(200) NOT NULL'),
+        ('creditos', 'INTEGER NOT NULL'),
+        ('departamento_id', 'INTEGER'),
+        ('profesor_id', 'INTEGER'),
+    ]),
+    ('estudiantes', 'Tabla de estudiantes', [
+        ('nombre', 'VARCHAR(100) NOT NULL'),
+        ('apellido', 'VARCHAR(100) NOT NULL'),
+        ('email', 'VARCHAR(200) NOT NULL'),
+        ('edad', 'INTEGER NOT NULL'),
+        ('universidad_id', 'INTEGER'),
+        ('pais_origen_id', 'INTEGER'),
+        ('carrera', 'VARCHAR(100) NOT NULL'),
+        ('año_ingreso', 'INTEGER NOT NULL'),
+        ('promedio', 'DECIMAL(3,2) NOT NULL'),
+    ]),
+    ('matriculas', 'Tabla de matrículas (vincula estudiantes con cursos del catálogo)', [
+        ('estudiante_id', 'INTEGER'),
+        ('curso_id', 'INTEGER'),
+        ('semestre', 'INTEGER NOT NULL'),
+        ('nota', 'DECIMAL(3,2) NOT NULL'),
+        ('año', 'INTEGER NOT NULL'),
+    ]),
+]
+
+# Claves foráneas: (tabla, columna) -> tabla referenciada
+CLAVES_FORANEAS = {
+    ('universidades', 'pais_id'): 'paises',
+    ('profesores', 'departamento_id'): 'departamentos',
+    ('cursos_catalogo', 'departamento_id'): 'departamentos',
+    ('cursos_catalogo', 'profesor_id'): 'profesores',
+    ('estudiantes', 'universidad_id'): 'universidades',
+    ('estudiantes', 'pais_origen_id'): 'paises',
+    ('matriculas', 'estudiante_id'): 'estudiantes',
+    ('matriculas', 'curso_id'): 'cursos_catalogo',
+}
+
+# Columnas de cada tabla en orden (mismo orden que los archivos CSV)
+COLUMNAS = {tabla: ('id',) + tuple(nombre for nombre, _ in columnas) for tabla, _, columnas in ESQUEMA}
+
+# Índices secundarios, creados después de cargar todos los datos
+INDICES = [
+    "CREATE INDEX idx_estudiantes_nombre ON estudiantes(nombre, apellido);",
+    "CREATE INDEX idx_estudiantes_nombre_completo ON estudiantes (LOWER(nombre || ' ' || apellido));",
+    "CREATE INDEX idx_matriculas_estudiante ON matriculas(estudiante_id);",
+    "CREATE INDEX idx_matriculas_curso ON matriculas(curso_id);",
+    "CREATE INDEX idx_profesores_departamento ON profesores(departamento_id);",
+    "CREATE INDEX idx_cursos_departamento ON cursos_catalogo(departamento_id);",
+]
+
+# Índice de trigramas para la búsqueda por subcadena. Es opcional: pg_trgm viene en
+# contrib y puede no estar instalada, así que va en un bloque final que puede fallar
+INDICES_TRIGRAMAS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX idx_estudiantes_nombre_trgm ON estudiantes USING GIN ((nombre || ' ' || apellido) gin_trgm_ops);",
+]
+
+# Salida para COPY: un CSV por tabla más el esquema con la carga en medio
+DIRECTORIO_COPY = 'data_copy'
+
+def write_sql_tables(f, restricciones=True):
+    """Escribe el DROP/CREATE de todas las tablas.
+
+    Con restricciones=False las tablas se crean sin clave primaria ni claves
+    foráneas (solo el id SERIAL), para agregarlas después de la carga masiva.
+    """
+    f.write("\n-- Eliminar tablas existentes\n")
+    for tabla, _, _ in reversed(ESQUEMA):
+        f.write(f"DROP TABLE IF EXISTS {tabla} CASCADE;\n")
+
+    for tabla, comentario, columnas in ESQUEMA:
+        definiciones = ["id SERIAL PRIMARY KEY" if restricciones else "id SERIAL"]
+        for nombre, tipo in columnas:
+            referencia = CLAVES_FORANEAS.get((tabla, nombre))
+            if restricciones and referencia:
+                tipo = f"{tipo} REFERENCES {referencia}(id)"
+            definiciones.append(f"{nombre} {tipo}")
+        f.write(f"\n-- {comentario}\nCREATE TABLE {tabla} (\n    " + ",\n    ".join(definiciones) + "\n);\n")
+
+def write_sql_header(f, countries, universities, departments, professors, courses):
+    """Escribe el esquema y las tablas de catálogo (pequeñas) al inicio de data_sql.sql"""
+    # PostgreSQL no admite CREATE DATABASE IF NOT EXISTS: el archivo se ejecuta sobre una base ya creada
+    f.write("-- Ejecutar sobre una base existente: psql -d universidad_db -f data_sql.sql\n")
+    write_sql_tables(f)
+    f.write("\n-- Insertar países\n")
+
+    for country in countries:
+        nombre = escape_sql_string(country['nombre'])
+        f.write(f"INSERT INTO paises (id, nombre, codigo) VALUES ({country['id']}, '{nombre}', '{country['codigo']}');\n")
+
+    f.write("\n-- Insertar universidades\n")
+    for uni in universities:
+        nombre = escape_sql_string(uni['nombre'])
+        ciudad = escape_sql_string(uni['ciudad'])
+        f.write(f"INSERT INTO universidades (id, nombre, pais_id, ciudad) VALUES ({uni['id']}, '{nombre}', {uni['pais_id']}, '{ciudad}');\n")
+
+    f.write("\n-- Insertar departamentos\n")
+    for dept in departments:
+        nombre = escape_sql_string(dept['nombre'])
+        f.write(f"INSERT INTO departamentos (id, nombre, presupuesto) VALUES ({dept['id']}, '{nombre}', {dept['presupuesto']});\n")
+
+    f.write("\n-- Insertar profesores\n")
+    for prof in professors:
+        nombre = escape_sql_string(prof['nombre'])
+        apellido = escape_sql_string(prof['apellido'])
+        f.write(f"INSERT INTO profesores (id, nombre, apellido, email, departamento_id, años_experiencia) VALUES ({prof['id']}, '{nombre}', '{apellido}', '{prof['email']}', {prof['departamento_id']}, {prof['años_experiencia']});\n")
+
+    f.write("\n-- Insertar catálogo de cursos\n")
+    for curso in courses:
+        nombre = escape_sql_string(curso['nombre'])
+        f.write(f"INSERT INTO cursos_catalogo (id, codigo, nombre, creditos, departamento_id, profesor_id) VALUES ({curso['id']}, '{curso['codigo']}', '{nombre}', {curso['creditos']}, {curso['departamento_id']}, {curso['profesor_id']});\n")
+
+    f.write("\n-- Insertar estudiantes y sus matrículas (por bloques)\n")
+
+def lineas_csv(filas):
+    """Una línea CSV por fila (con su fin de línea), con las mismas comillas que csv.writer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    lineas = []
+    for fila in filas:
+        writer.writerow(fila)
+        lineas.append(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+    return lineas
+
+def format_student_rows(students, sql):
+    """Una línea por estudiante: fila CSV (--sql copy) o INSERT de data_sql.sql"""
+    filas = students.filas(COLUMNAS['estudiantes'])
+    if sql == 'copy':
+        return lineas_csv(filas)
+    return [f"INSERT INTO estudiantes (id, nombre, apellido, email, edad, universidad_id, pais_origen_id, carrera, año_ingreso, promedio) VALUES ({student_id}, '{escape_sql_string(nombre)}', '{escape_sql_string(apellido)}', '{email}', {edad}, {universidad_id}, {pais_origen_id}, '{escape_sql_string(carrera)}', {año_ingreso}, {promedio});\n"
+            for student_id, nombre, apellido, email, edad, universidad_id, pais_origen_id, carrera, año_ingreso, promedio in filas]
+
+# Lo que va antes del id en cada línea de matrícula: los ids se asignan al escribir
+PREFIJO_MATRICULAS = {
+    'inserts': "INSERT INTO matriculas (id, estudiante_id, curso_id, semestre, nota, año) VALUES (",
+    'copy': "",
+}
+
+def format_enrollment_rows(enrollments, sql):
+    """Una línea por matrícula sin el id ni lo anterior a él (ver PREFIJO_MATRICULAS)"""
+    filas = enrollments.filas(COLUMNAS['matriculas'][1:])
+    if sql == 'copy':
+        # Todas las columnas son numéricas: csv.writer no les pondría comillas
+        return [f",{estudiante_id},{curso_id},{semestre},{nota},{año}\r\n"
+                for estudiante_id, curso_id, semestre, nota, año in filas]
+    return [f", {estudiante_id}, {curso_id}, {semestre}, {nota}, {año});\n"
+            for estudiante_id, curso_id, semestre, nota, año in filas]
+
+def format_documents(documents, nosql):
+    """Serializa los documentos: uno por línea (ndjson) o precedidos de ",\\n" (elementos del arreglo JSON)"""
+    # json.dumps usa el codificador en C; json.dump sobre un archivo va por el de Python puro
+    if nosql == 'ndjson':
+        return [json.dumps(doc, ensure_ascii=False) + "\n" for doc in documents]
+    return [",\n" + json.dumps(doc, ensure_ascii=False) for doc in documents]
+
+def format_chunk(students, enrollments, catalogs, sql, nosql):
+    """Formatea la salida de un bloque: una línea por estudiante, una por matrícula y un documento por estudiante"""
+    return {
+        'filas_estudiantes': format_student_rows(students, sql),
+        'filas_matriculas': format_enrollment_rows(enrollments, sql),
+        'documentos': format_documents(build_nosql_documents(students, enrollments, catalogs), nosql),
+    }
+
+def write_enrollment_rows(f, filas, primer_id, sql):
+    """Escribe las matrículas de un bloque con ids consecutivos desde primer_id"""
+    ids = map(str, range(primer_id, primer_id + len(filas)))
+    f.writelines(map(''.join, zip(itertools.repeat(PREFIJO_MATRICULAS[sql]), ids, filas)))
+
+def write_documents(f, documentos, first):
+    """Agrega los documentos serializados de un bloque a data_nosql.json/.ndjson.
+
+    En el arreglo JSON cada documento viene precedido de ",\\n": al primero del
+    archivo (`first`) se le quita la coma. Devuelve el nuevo valor de `first`.
+    """
+    if first and documentos[0].startswith(","):
+        f.write(documentos[0][1:])
+        documentos = itertools.islice(documentos, 1, None)
+    f.writelines(documentos)
+    return False
+
+def write_sql_footer(f):
+    """Crea los índices al final, después de cargar todos los datos"""
+    f.write("\n-- Crear índices para mejorar rendimiento (pero aún así SQL será más lento)\n")
+    for indice in INDICES:
+        f.write(indice + "\n")
+
+def write_sql_trigramas(f):
+    """Bloque final opcional con pg_trgm: si la extensión no está, falla solo esto"""
+    f.write("\n-- Opcional: índice de trigramas (requiere la extensión pg_trgm de contrib).\n")
+    f.write("-- Si no está disponible estas sentencias fallan y el resto de la carga queda igual.\n")
+    for indice in INDICES_TRIGRAMAS:
+        f.write(indice + "\n")
+
+def open_csv(directorio, tabla):
+    """Abre el CSV de una tabla y escribe la fila de encabezado; devuelve (archivo, writer)"""
+    f = open(os.path.join(directorio, f"{tabla}.csv"), 'w', encoding='utf-8', newline='')
+    writer = csv.writer(f)
+    writer.writerow(COLUMNAS[tabla])
+    return f, writer
+
+def write_csv_rows(writer, tabla, filas):
+    """Agrega filas (diccionarios con las columnas de la tabla) a su CSV"""
+    columnas = COLUMNAS[tabla]
+    writer.writerows([fila[c] for c in columnas] for fila in filas)
+
+def write_copy_catalogs(directorio, countries, universities, departments, professors, courses):
+    """Escribe los CSV de las tablas de catálogo (pequeñas, de una vez)"""
+    for tabla, filas in (('paises', countries), ('universidades', universities),
+                         ('departamentos', departments), ('profesores', professors),
+                         ('cursos_catalogo', courses)):
+        f, writer = open_csv(directorio, tabla)
+        with f:
+            write_csv_rows(writer, tabla, filas)
+
+def write_copy_schema(directorio, trigramas=True):
+    """Escribe schema.sql: tablas sin restricciones, \\copy de cada CSV y después
+    claves primarias, claves foráneas, índices y secuencias. El índice de
+    trigramas opcional va último, con ON_ERROR_STOP desactivado.
+
+    Crear índices y validar claves foráneas sobre la tabla ya cargada es mucho
+    más rápido que mantenerlos fila a fila durante la carga. Las rutas de los
+    \\copy son relativas a la carpeta del proyecto, desde donde se ejecuta:
+    psql -d universidad_db -f data_copy/schema.sql
+    """
+    with open(os.path.join(directorio, 'schema.sql'), 'w', encoding='utf-8') as f:
+        f.write("-- Ejecutar desde la carpeta del proyecto: psql -d universidad_db -f data_copy/schema.sql\n")
+        f.write("\\set ON_ERROR_STOP on\n")
+        write_sql_tables(f, restricciones=False)
+
+        f.write("\n-- Carga masiva (sin índices ni claves foráneas todavía)\n")
+        for tabla, _, _ in ESQUEMA:
+            ruta = f"{directorio}/{tabla}.csv"
+            f.write(f"\\copy {tabla} ({', '.join(COLUMNAS[tabla])}) FROM '{ruta}' WITH (FORMAT csv, HEADER true)\n")
+
+        f.write("\n-- Claves primarias\n")
+        for tabla, _, _ in ESQUEMA:
+            f.write(f"ALTER TABLE {tabla} ADD PRIMARY KEY (id);\n")
+
+        f.write("\n-- Claves foráneas\n")
+        for (tabla, columna), referencia in CLAVES_FORANEAS.items():
+            f.write(f"ALTER TABLE {tabla} ADD FOREIGN KEY ({columna}) REFERENCES {referencia}(id);\n")
+
+        write_sql_footer(f)
+
+        f.write("\n-- Sincronizar las secuencias con los ids cargados\n")
+        for tabla, _, _ in ESQUEMA:
+            f.write(f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {tabla};\n")
+
+        f.write("\nANALYZE;\n")
+
+        # Va al final y sin ON_ERROR_STOP: si falta pg_trgm, la carga ya quedó completa
+        if trigramas:
+            f.write("\n\\set ON_ERROR_STOP off\n")
+            write_sql_trigramas(f)
+
+def build_catalogs(countries, universities, departments, professors, courses):
+    """Diccionarios por id para desnormalizar los documentos NoSQL"""
+    return {
+        'paises': {c['id']: c for c in countries},
+        'universidades': {u['id']: u for u in universities},
+        'departamentos': {d['id']: d for d in departments},
+        'profesores': {p['id']: p for p in professors},
+        'cursos': {c['id']: c for c in courses},
+    }
+
+def build_nosql_documents(students, enrollments, catalogs):
+    """Arma los documentos de MongoDB de un bloque - TODO EN UN DOCUMENTO"""
+    countries_dict = catalogs['paises']
+    universities_dict = catalogs['universidades']
+    departments_dict = catalogs['departamentos']
+    professors_dict = catalogs['profesores']
+    courses_dict = catalogs['cursos']
+
+    # Crear diccionario de matrículas por estudiante (solo las del bloque)
     enrollments_by_student = {}
-    for enrollment in enrollments:
+    for enrollment in enrollments.registros(COLUMNAS['matriculas']):
         student_id = enrollment['estudiante_id']
         if student_id not in enrollments_by_student:
             enrollments_by_student[student_id] = []
@@ -316,18 +788,13 @@ def save_nosql_data(countries, universities, students, enrollments, departments,
             }
         })
 
-    # Crear documentos completos (TOTALMENTE desnormalizados - TODO en 1 documento)
-    print("  Creando documentos NoSQL...")
-    nosql_students = []
-    for idx, student in enumerate(students):
-        if (idx + 1) % 5000 == 0:
-            print(f"  {idx + 1} documentos creados...")
-        
+    # Documentos completos (TOTALMENTE desnormalizados - TODO en 1 documento)
+    for student in students.registros(COLUMNAS['estudiantes']):
         uni = universities_dict[student['universidad_id']]
         pais_uni = countries_dict[uni['pais_id']]
         pais_origen = countries_dict[student['pais_origen_id']]
 
-        nosql_students.append({
+        yield {
             'id': student['id'],
             'nombre': student['nombre'],
             'apellido': student['apellido'],
@@ -352,57 +819,142 @@ def save_nosql_data(countries, universities, students, enrollments, departments,
                 'codigo': pais_origen['codigo']
             },
             'matriculas': enrollments_by_student.get(student['id'], [])
-        })
-
-    print("  Escribiendo archivo JSON...")
-    with open('data_nosql.json', 'w', encoding='utf-8') as f:
-        json.dump(nosql_students, f, ensure_ascii=False)
-
-    print(f"✓ Archivo NoSQL generado: data_nosql.json")
+        }
+
+def peak_memory_mb(hijos=False):
+    """Memoria máxima (RSS) en MB del proceso, o con hijos=True del mayor de los procesos
+    hijos ya terminados (los del pool); None si no se puede medir"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if hijos else resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera los datos de demostración para PostgreSQL y MongoDB")
+    parser.add_argument('--sql', choices=['inserts', 'copy'], default='inserts',
+                        help="Formato SQL: data_sql.sql con un INSERT por fila, o un CSV por tabla en "
+                             f"{DIRECTORIO_COPY}/ con schema.sql para cargarlos con \\copy (mucho más rápido)")
+    parser.add_argument('--nosql', choices=['json', 'ndjson'], default='json',
+                        help="Formato NoSQL: un arreglo en data_nosql.json, o un documento por línea en "
+                             "data_nosql.ndjson (carga en streaming)")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                        help="Procesos que generan los bloques de estudiantes en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument('--semilla', type=int, default=42,
+                        help="Semilla global: la misma semilla produce los mismos datos con cualquier cantidad de procesos")
+    parser.add_argument('--escala', type=float, default=ESCALA_GENERATE_DATA,
+                        help="Factor de escala del dataset: 1 = 25k estudiantes, 40 = 1M, 400 = 10M "
+                             "(el resto de las cantidades se deriva de él, ver escala.py)")
+    parser.add_argument('--rapido', action='store_true',
+                        help="Precalcula pools de valores de Faker y genera cada bloque vectorizado con NumPy "
+                             "(mismas distribuciones, órdenes de magnitud más rápido; requiere numpy)")
+    parser.add_argument('--sin-trigramas', action='store_true',
+                        help="No escribir la extensión pg_trgm ni el índice de trigramas")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    t = tamanos(args.escala)
+    if args.rapido and np is None:
+        print("✗ --rapido requiere NumPy: pip install numpy")
+        sys.exit(1)
+
     print("=" * 70)
     print("GENERANDO DATOS MASIVOS - SQL vs NoSQL")
     print("=" * 70)
-    print(f"- {NUM_PAISES} países")
-    print(f"- {NUM_UNIVERSIDADES} universidades")
-    print(f"- {NUM_DEPARTAMENTOS} departamentos")
-    print(f"- {NUM_PROFESORES} profesores")
-    print(f"- {NUM_CURSOS_CATALOGO} cursos en catálogo")
-    print(f"- {NUM_ESTUDIANTES} estudiantes")
+    for linea in describir(args.escala, t):
+        print(linea)
+    print(f"- {args.procesos} procesos, semilla {args.semilla}")
     print("\n⚠️  ESTO PUEDE TOMAR 10-30 MINUTOS...\n")
 
-    countries = generate_countries()
+    # Los catálogos se generan en este proceso con la semilla global; los estudiantes, por bloques en paralelo
+    random.seed(args.semilla)
+    fake.seed_instance(args.semilla)
+
+    countries = generate_countries(t['paises'])
     print("✓ Países generados")
 
-    universities = generate_universities(countries)
+    universities = generate_universities(countries, t['universidades'])
     print("✓ Universidades generadas")
 
-    departments = generate_departments()
+    departments = generate_departments(t['departamentos'])
     print("✓ Departamentos generados")
 
-    professors = generate_professors(departments)
+    professors = generate_professors(departments, t['profesores'])
     print("✓ Profesores generados")
 
-    courses = generate_course_catalog(departments, professors)
+    courses = generate_course_catalog(departments, professors, t['cursos'])
     print("✓ Catálogo de cursos generado")
 
-    students = generate_students(universities, countries)
-    print(f"✓ {len(students)} estudiantes generados")
-
-    enrollments = generate_enrollment(students, courses)
-    print(f"✓ {len(enrollments)} matrículas generadas")
-
-    print("\nGuardando archivos (esto puede tardar)...")
-    save_sql_data(countries, universities, students, enrollments, departments, professors, courses)
-    save_nosql_data(countries, universities, students, enrollments, departments, professors, courses)
+    pools = generate_pools()
+    print(f"✓ Pools generados: {len(pools['nombres']):,} nombres x {len(pools['apellidos']):,} apellidos "
+          f"= {len(pools['nombres']) * len(pools['apellidos']):,} nombres completos distintos")
+
+    # Estudiantes y matrículas en streaming: cada bloque va directo a los archivos de salida
+    print("\nGenerando y guardando estudiantes por bloques...")
+    start_time = time.time()
+    catalogs = build_catalogs(countries, universities, departments, professors, courses)
+    total_students = 0
+    total_enrollments = 0
+
+    with ExitStack() as stack:
+        nosql_path = f"data_nosql.{args.nosql}"
+        nosql_file = stack.enter_context(open(nosql_path, 'w', encoding='utf-8'))
+        if args.sql == 'copy':
+            os.makedirs(DIRECTORIO_COPY, exist_ok=True)
+            write_copy_schema(DIRECTORIO_COPY, not args.sin_trigramas)
+            write_copy_catalogs(DIRECTORIO_COPY, countries, universities, departments, professors, courses)
+            # Solo se escribe el encabezado con csv.writer; las filas llegan ya formateadas
+            students_file = stack.enter_context(open_csv(DIRECTORIO_COPY, 'estudiantes')[0])
+            enrollments_file = stack.enter_context(open_csv(DIRECTORIO_COPY, 'matriculas')[0])
+        else:
+            sql_file = stack.enter_context(open('data_sql.sql', 'w', encoding='utf-8'))
+            write_sql_header(sql_file, countries, universities, departments, professors, courses)
+            students_file = enrollments_file = sql_file
+        if args.nosql == 'json':
+            nosql_file.write("[")
+        first = True
+
+        # Los bloques llegan formateados por los procesos del pool: aquí solo se escriben
+        for bloque in generate_student_chunks(universities, countries, courses, catalogs, (args.sql, args.nosql),
+                                              t['estudiantes'], args.semilla, pools, args.procesos, args.rapido):
+            students_file.writelines(bloque['filas_estudiantes'])
+            write_enrollment_rows(enrollments_file, bloque['filas_matriculas'], bloque['primera_matricula'], args.sql)
+            first = write_documents(nosql_file, bloque['documentos'], first)
+
+            total_students += len(bloque['filas_estudiantes'])
+            total_enrollments += len(bloque['filas_matriculas'])
+            elapsed = time.time() - start_time
+            print(f"  {total_students:,}/{t['estudiantes']:,} estudiantes ({total_students / elapsed:,.0f}/s)...")
+
+        if args.sql != 'copy':
+            write_sql_footer(sql_file)
+            if not args.sin_trigramas:
+                write_sql_trigramas(sql_file)
+        if args.nosql == 'json':
+            nosql_file.write("\n]\n")
+
+    print(f"✓ {total_students:,} estudiantes generados")
+    print(f"✓ {total_enrollments:,} matrículas generadas")
+    if args.sql == 'copy':
+        print(f"✓ Archivos CSV generados en {DIRECTORIO_COPY}/ (cargar con: psql -d universidad_db -f {DIRECTORIO_COPY}/schema.sql)")
+    else:
+        print(f"✓ Archivo SQL generado: data_sql.sql")
+    print(f"✓ Archivo NoSQL generado: {nosql_path}")
 
     print("\n" + "=" * 70)
     print("¡DATOS GENERADOS EXITOSAMENTE!")
     print("=" * 70)
-    total_sql = len(countries) + len(universities) + len(departments) + len(professors) + len(courses) + len(students) + len(enrollments)
+    total_sql = len(countries) + len(universities) + len(departments) + len(professors) + len(courses) + total_students + total_enrollments
     print(f"Total de registros SQL: {total_sql:,}")
-    print(f"Total de documentos NoSQL: {len(students):,}")
+    print(f"Total de documentos NoSQL: {total_students:,}")
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"Memoria máxima del proceso principal: {peak:,.1f} MB")
+        # Con más de un proceso la generación y el formateo ocurren en el pool
+        peak_pool = peak_memory_mb(hijos=True)
+        if args.procesos > 1 and peak_pool:
+            print(f"Memoria máxima de un proceso del pool: {peak_pool:,.1f} MB (x{args.procesos} procesos)")
     print(f"\nSQL necesitará 6-7 JOINs por búsqueda")
     print(f"NoSQL lee 1 documento completo")
     print("=" * 70)
@@ -0,0 +1,256 @@
+"""
+Motores asyncio para las búsquedas (asyncpg para PostgreSQL, driver async de MongoDB)
+Implementan las mismas operaciones que busquedas.py, con un límite de consultas en vuelo
+"""
+import asyncio
+import json
+import time
+
+from busquedas import (
+    IS_CLOUD, PG_CONFIG, PG_POOL_CONFIG, MONGO_CONFIG,
+    SQL_COINCIDENCIA_SUBCADENA, SQL_FILTROS, NOMBRE_COLLATION, NOSQL_CURSOR_BATCH_SIZE,
+    build_sql_search_query, build_sql_result, courses_from_json, build_nosql_result, to_dollar_params,
+)
+
+# Drivers opcionales: la app funciona sin ellos, solo con el motor de hilos
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+try:
+    # pymongo >= 4.9 trae su propio cliente asyncio
+    from pymongo import AsyncMongoClient
+except ImportError:
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+    except ImportError:
+        AsyncMongoClient = None
+
+# Consultas en vuelo por defecto (límite del semáforo)
+ASYNC_INFLIGHT = 32
+
+def postgres_async_disponible():
+    """Indica si está instalado asyncpg (y PostgreSQL se usa en este entorno)"""
+    return asyncpg is not None and not IS_CLOUD
+
+def mongo_async_disponible():
+    """Indica si hay un driver asyncio para MongoDB (pymongo AsyncMongoClient o motor)"""
+    return AsyncMongoClient is not None
+
+async def abrir_postgres_async(conexiones=1):
+    """Crea un pool de asyncpg con `conexiones` abiertas de antemano (tope PG_POOL_MAX)"""
+    async def init(conn):
+        # Decodificar los cursos de json_agg igual que psycopg2 (lista de diccionarios)
+        await conn.set_type_codec('json', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+    maxconn = PG_POOL_CONFIG['maxconn']
+    return await asyncpg.create_pool(
+        host=PG_CONFIG['host'],
+        port=PG_CONFIG['port'],
+        user=PG_CONFIG['user'],
+        password=PG_CONFIG['password'],
+        database=PG_CONFIG['database'],
+        min_size=min(conexiones, maxconn),
+        max_size=maxconn,
+        timeout=PG_POOL_CONFIG['timeout'],
+        init=init
+    )
+
+async def abrir_mongo_async():
+    """Abre un cliente asyncio de MongoDB y devuelve (cliente, base de datos)"""
+    if IS_CLOUD and 'uri' in MONGO_CONFIG:
+        client = AsyncMongoClient(MONGO_CONFIG['uri'])
+    else:
+        client = AsyncMongoClient(MONGO_CONFIG['host'], MONGO_CONFIG['port'])
+
+    db = client[MONGO_CONFIG['database']]
+    # Verificar conexión
+    await db.list_collection_names()
+    return client, db
+
+async def cerrar_mongo_async(client):
+    """Cierra el cliente (en pymongo async close() es una corrutina; en motor no)"""
+    cierre = client.close()
+    if asyncio.iscoroutine(cierre):
+        await cierre
+
+async def get_all_students_postgres_async(pool):
+    """Lista de TODOS los estudiantes de PostgreSQL ordenados alfabéticamente"""
+    async with pool.acquire() as conn:
+        rows = await conn.fetch("SELECT nombre, apellido FROM estudiantes ORDER BY apellido, nombre")
+    return [f"{row[0]} {row[1]}" for row in rows]
+
+async def get_all_students_mongo_async(db):
+    """Lista de TODOS los estudiantes de MongoDB ordenados alfabéticamente"""
+    cursor = db.estudiantes.find({}, {'nombre': 1, 'apellido': 1}).sort([('apellido', 1), ('nombre', 1)])
+    return [f"{s['nombre']} {s['apellido']}" async for s in cursor]
+
+async def search_student_sql_async(pool, student_name, coincidencia=SQL_COINCIDENCIA_SUBCADENA, una_consulta=False, resumen=False):
+    """Versión asyncio de search_student_sql (mismas consultas y mismo resultado)"""
+    start_time = time.perf_counter()
+
+    async with pool.acquire() as conn:
+        filtro, parametro = SQL_FILTROS[coincidencia]
+        query = build_sql_search_query(filtro, una_consulta, resumen) + """
+        LIMIT 1
+        """
+        result = await conn.fetchrow(to_dollar_params(query), parametro(student_name))
+
+        # Obtener cursos detallados
+        courses = []
+        if result and una_consulta:
+            courses = courses_from_json(result[16])
+        elif result:
+            courses = await conn.fetch("""
+                SELECT curso, semestre, nota, creditos
+                FROM matriculas
+                WHERE estudiante_id = $1
+                ORDER BY semestre, curso
+            """, result[0])
+
+    # El tiempo incluye armar el diccionario, igual que en busquedas.py
+    data = build_sql_result(result, courses) if result else None
+
+    return data, time.perf_counter() - start_time
+
+async def search_students_sql_batch_async(pool, student_names, una_consulta=False, resumen=False):
+    """Versión asyncio de search_students_sql_batch (un lote con consultas set-based)"""
+    start_time = time.perf_counter()
+
+    async with pool.acquire() as conn:
+        nombres = [name.strip().lower() for name in student_names]
+        query = build_sql_search_query("LOWER(e.nombre || ' ' || e.apellido) = ANY(%s)", una_consulta, resumen) + """
+        ORDER BY e.id
+        """
+        rows = await conn.fetch(to_dollar_params(query), nombres)
+
+        # Un estudiante por nombre, igual que el LIMIT 1 de la búsqueda individual
+        rows_by_name = {}
+        for row in rows:
+            rows_by_name.setdefault(f"{row[1]} {row[2]}".lower(), row)
+
+        courses_by_student = {}
+        if una_consulta:
+            for row in rows_by_name.values():
+                courses_by_student[row[0]] = courses_from_json(row[16])
+        elif rows_by_name:
+            cursos = await conn.fetch("""
+                SELECT estudiante_id, curso, semestre, nota, creditos
+                FROM matriculas
+                WHERE estudiante_id = ANY($1)
+                ORDER BY estudiante_id, semestre, curso
+            """, [row[0] for row in rows_by_name.values()])
+            for c in cursos:
+                courses_by_student.setdefault(c[0], []).append(tuple(c)[1:])
+
+    results = []
+    for name in nombres:
+        row = rows_by_name.get(name)
+        if row:
+            results.append(build_sql_result(row, courses_by_student.get(row[0], [])))
+
+    return results, time.perf_counter() - start_time
+
+async def search_student_nosql_async(db, student_name):
+    """Versión asyncio de search_student_nosql"""
+    start_time = time.perf_counter()
+
+    result = await db.estudiantes.find_one(
+        {'nombre_completo': student_name.strip()},
+        collation=NOMBRE_COLLATION
+    )
+
+    data = build_nosql_result(result) if result else None
+
+    return data, time.perf_counter() - start_time
+
+async def search_students_nosql_batch_async(db, student_names, cursor_batch_size=NOSQL_CURSOR_BATCH_SIZE):
+    """Versión asyncio de search_students_nosql_batch (un bloque con $in)"""
+    start_time = time.perf_counter()
+
+    nombres = [name.strip() for name in student_names]
+    cursor = db.estudiantes.find(
+        {'nombre_completo': {'$in': nombres}},
+        collation=NOMBRE_COLLATION
+    ).sort('id', 1).batch_size(cursor_batch_size)
+
+    docs_by_name = {}
+    async for doc in cursor:
+        docs_by_name.setdefault(doc['nombre_completo'].lower(), doc)
+
+    results = [build_nosql_result(docs_by_name[name.lower()]) for name in nombres if name.lower() in docs_by_name]
+
+    return results, time.perf_counter() - start_time
+
+async def _run_bounded(tasks, search_fn, recurso, concurrency, on_progress):
+    """Lanza una corrutina por tarea con a lo sumo `concurrency` en vuelo"""
+    outputs = [None] * len(tasks)
+    latencies = [0.0] * len(tasks)
+    completions = [0.0] * len(tasks)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(i, task):
+        async with semaphore:
+            return i, await search_fn(recurso, task), time.perf_counter()
+
+    start_time = time.perf_counter()
+
+    pending = [run_one(i, task) for i, task in enumerate(tasks)]
+    for done, future in enumerate(asyncio.as_completed(pending), 1):
+        i, (outputs[i], latencies[i]), fin = await future
+        completions[i] = fin - start_time
+        if on_progress:
+            on_progress(done, len(tasks))
+
+    wall_time = time.perf_counter() - start_time
+
+    return outputs, latencies, wall_time, completions
+
+async def _run_searches_async(tasks, motor, search_fn, concurrency, on_progress):
+    # Las conexiones se abren antes de empezar a medir, como el pool persistente del motor de hilos
+    if motor == 'postgres':
+        pool = await abrir_postgres_async(concurrency)
+        try:
+            return await _run_bounded(tasks, search_fn, pool, concurrency, on_progress)
+        finally:
+            await pool.close()
+
+    client, db = await abrir_mongo_async()
+    try:
+        return await _run_bounded(tasks, search_fn, db, concurrency, on_progress)
+    finally:
+        await cerrar_mongo_async(client)
+
+def run_searches_async(tasks, motor, search_fn, concurrency=ASYNC_INFLIGHT, on_progress=None):
+    """Equivalente asyncio de run_searches.
+
+    motor es 'postgres' o 'mongo'; search_fn(recurso, tarea) es una corrutina que
+    recibe el pool de asyncpg o la base de datos async y devuelve (resultado, tiempo).
+    Como mucho `concurrency` consultas quedan en vuelo a la vez. Devuelve
+    (resultados en el orden de las tareas, latencia de cada llamada, tiempo de pared,
+    segundos desde el inicio hasta que terminó cada llamada).
+    """
+    return asyncio.run(_run_searches_async(tasks, motor, search_fn, concurrency, on_progress))
+
+async def _get_all_students_async():
+    if postgres_async_disponible():
+        try:
+            pool = await abrir_postgres_async()
+            try:
+                return await get_all_students_postgres_async(pool)
+            finally:
+                await pool.close()
+        except Exception:
+            # Si PostgreSQL no está disponible, usar MongoDB
+            pass
+
+    client, db = await abrir_mongo_async()
+    try:
+        return await get_all_students_mongo_async(db)
+    finally:
+        await cerrar_mongo_async(client)
+
+def get_all_students_async():
+    """Lista de estudiantes con los drivers asyncio (PostgreSQL, o MongoDB si no está disponible)"""
+    return asyncio.run(_get_all_students_async())
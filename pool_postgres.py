@@ -0,0 +1,199 @@
+"""
+Pool de conexiones a PostgreSQL seguro para hilos
+Reemplaza la conexión única compartida por todas las sesiones de Streamlit
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolAgotadoError(Exception):
+    """No se liberó ninguna conexión del pool dentro del tiempo de espera"""
+
+
+class PoolPostgres:
+    """Pool de conexiones con tamaño mínimo/máximo, verificación y reconexión.
+
+    `conectar` es una función sin argumentos que abre una conexión nueva, lo que
+    permite usar el mismo pool con distintos drivers. Cuando todas las conexiones
+    están en uso y se alcanzó `maxconn`, los hilos esperan (hasta `timeout`
+    segundos) a que otra se libere. Las conexiones que estuvieron inactivas más
+    de `verificar_tras` segundos se comprueban con `SELECT 1` antes de
+    entregarse, y las que se rompen durante su uso se descartan y se reemplazan.
+    """
+
+    def __init__(self, conectar, minconn=1, maxconn=10, timeout=30.0, verificar_tras=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Se requiere 0 <= minconn <= maxconn y maxconn >= 1")
+
+        self.conectar = conectar
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.verificar_tras = verificar_tras
+
+        self._cond = threading.Condition()
+        self._libres = []  # (conexión, momento en que se devolvió)
+        self._abiertas = 0
+        self._en_uso = 0
+
+        # Estadísticas para la barra lateral
+        self._entregas = 0
+        self._esperas = 0
+        self._tiempo_espera = 0.0
+        self._espera_max = 0.0
+        self._reconexiones = 0
+        self._max_en_uso = 0
+
+        for _ in range(minconn):
+            self._libres.append((self.conectar(), time.monotonic()))
+            self._abiertas += 1
+
+    def _esta_viva(self, conn):
+        """Comprueba que la conexión siga respondiendo"""
+        if conn.closed:
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _descartar(self, conn):
+        """Cierra una conexión sin devolverla al pool"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._abiertas -= 1
+            self._cond.notify()
+
+    def obtener(self):
+        """Saca una conexión del pool, esperando si todas están en uso"""
+        start_time = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        hubo_espera = False
+
+        with self._cond:
+            while True:
+                if self._libres:
+                    conn, devuelta = self._libres.pop()
+                    break
+                if self._abiertas < self.maxconn:
+                    # Reservar el cupo y abrir la conexión fuera del lock
+                    conn, devuelta = None, None
+                    self._abiertas += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolAgotadoError(f"Sin conexiones libres tras {self.timeout}s ({self.maxconn} en uso)")
+                hubo_espera = True
+                self._cond.wait(remaining)
+
+            self._en_uso += 1
+            self._max_en_uso = max(self._max_en_uso, self._en_uso)
+
+        try:
+            if conn is None:
+                conn = self.conectar()
+            elif time.monotonic() - devuelta > self.verificar_tras and not self._esta_viva(conn):
+                # Conexión caída (reinicio del servidor, timeout de red...): reemplazarla
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = self.conectar()
+                with self._cond:
+                    self._reconexiones += 1
+        except Exception:
+            with self._cond:
+                self._abiertas -= 1
+                self._en_uso -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.perf_counter() - start_time
+        with self._cond:
+            self._entregas += 1
+            self._tiempo_espera += waited
+            self._espera_max = max(self._espera_max, waited)
+            if hubo_espera:
+                self._esperas += 1
+
+        return conn
+
+    def devolver(self, conn, descartar=False):
+        """Devuelve una conexión al pool (o la descarta si quedó inutilizable)"""
+        with self._cond:
+            self._en_uso -= 1
+
+        if descartar or conn.closed:
+            self._descartar(conn)
+            return
+
+        with self._cond:
+            self._libres.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def conexion(self):
+        """Context manager: `with pool.conexion() as conn: ...`"""
+        conn = self.obtener()
+        try:
+            yield conn
+        except Exception:
+            # Si el error rompió la conexión no se devuelve al pool
+            self.devolver(conn, descartar=bool(conn.closed))
+            raise
+        else:
+            self.devolver(conn)
+
+    def en_cada_libre(self, funcion):
+        """Aplica funcion(conn) a cada conexión libre y devuelve la lista de resultados.
+
+        Sirve para leer estado propio de cada sesión (p. ej. pg_prepared_statements).
+        Las conexiones se marcan en uso mientras tanto y luego vuelven al pool.
+        """
+        with self._cond:
+            libres, self._libres = self._libres, []
+            self._en_uso += len(libres)
+
+        resultados = []
+        try:
+            for conn, _ in libres:
+                resultados.append(funcion(conn))
+        finally:
+            for conn, _ in libres:
+                self.devolver(conn)
+        return resultados
+
+    def estadisticas(self):
+        """Uso actual y acumulado del pool"""
+        with self._cond:
+            return {
+                'abiertas': self._abiertas,
+                'en_uso': self._en_uso,
+                'libres': len(self._libres),
+                'maxconn': self.maxconn,
+                'max_en_uso': self._max_en_uso,
+                'entregas': self._entregas,
+                'esperas': self._esperas,
+                'espera_promedio': self._tiempo_espera / self._entregas if self._entregas else 0.0,
+                'espera_max': self._espera_max,
+                'reconexiones': self._reconexiones,
+            }
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres"""
+        with self._cond:
+            libres, self._libres = self._libres, []
+            self._abiertas -= len(libres)
+        for conn, _ in libres:
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -4,7 +4,11 @@ Script rápido para configurar las bases de datos con datos mínimos
 import psycopg2
 from pymongo import MongoClient
 from faker import Faker
+import argparse
 import random
+from escala import ESCALA_QUICK_SETUP, MATRICULAS_POR_ESTUDIANTE, tamanos, describir
+from setup_databases_fixed import (nombre_completo, crear_indice_nombre_completo, crear_indices_busqueda,
+                                   crear_resumen_estudiantes, copiar_filas, ajustar_secuencia)
 
 fake = Faker(['es_ES'])
 
@@ -23,9 +27,17 @@ MONGO_CONFIG = {
     'database': 'universidad_db'
 }
 
-def setup_postgresql():
+def nota_decimal(valor):
+    """Redondea a 2 decimales sin pasar de 9.99: promedio y nota son DECIMAL(3,2)"""
+    return min(round(valor, 2), 9.99)
+
+def setup_postgresql(escala=ESCALA_QUICK_SETUP):
     """Configura PostgreSQL con datos mínimos"""
     print("Configurando PostgreSQL...")
+    t = tamanos(escala)
+    # Este esquema simplificado no tiene profesores ni departamentos
+    for linea in describir(escala, t, omitir=('departamentos', 'profesores')):
+        print(linea)
     
     # Crear base de datos
     conn = psycopg2.connect(**PG_CONFIG)
@@ -85,71 +97,67 @@ def setup_postgresql():
     conn.commit()
     print("✓ Tablas creadas")
     
-    # Insertar datos
+    # Insertar datos con COPY (ids asignados en el cliente)
     print("Insertando datos...")
     
     # Países
-    paises = []
-    for i in range(50):
-        cursor.execute(
-            "INSERT INTO paises (nombre, codigo) VALUES (%s, %s) RETURNING id",
-            (fake.country(), fake.country_code())
-        )
-        paises.append(cursor.fetchone()[0])
-    conn.commit()
-    print(f"✓ {len(paises)} países insertados")
+    paises = list(range(1, t['paises'] + 1))
+    copiar_filas(cursor, 'paises', ('id', 'nombre', 'codigo'),
+                 ((pais_id, fake.country(), fake.country_code()) for pais_id in paises))
     
     # Universidades
-    universidades = []
-    for i in range(100):
-        cursor.execute(
-            "INSERT INTO universidades (nombre, pais_id, ciudad) VALUES (%s, %s, %s) RETURNING id",
-            (f"Universidad {fake.company()}", random.choice(paises), fake.city())
-        )
-        universidades.append(cursor.fetchone()[0])
-    conn.commit()
-    print(f"✓ {len(universidades)} universidades insertadas")
+    universidades = list(range(1, t['universidades'] + 1))
+    copiar_filas(cursor, 'universidades', ('id', 'nombre', 'pais_id', 'ciudad'),
+                 ((uni_id, f"Universidad {fake.company()}", random.choice(paises), fake.city())
+                  for uni_id in universidades))
     
     # Estudiantes y matrículas
-    NUM_ESTUDIANTES = 1000
+    NUM_ESTUDIANTES = t['estudiantes']
     carreras = ['Ingeniería', 'Medicina', 'Derecho', 'Economía', 'Arquitectura', 'Psicología']
-    cursos = ['Matemáticas', 'Física', 'Química', 'Historia', 'Literatura', 'Programación', 'Estadística']
+    cursos_base = ['Matemáticas', 'Física', 'Química', 'Historia', 'Literatura', 'Programación', 'Estadística']
+    # Catálogo de cursos: crece con la escala, cada curso con sus créditos
+    cursos = [(f"{cursos_base[i % len(cursos_base)]} {i // len(cursos_base) + 1}", random.choice([3, 4, 5]))
+              for i in range(t['cursos'])]
     
-    for i in range(NUM_ESTUDIANTES):
-        nombre = fake.first_name()
-        apellido = fake.last_name()
-        
-        cursor.execute(
-            """INSERT INTO estudiantes (nombre, apellido, email, edad, universidad_id, 
-               pais_origen_id, carrera, año_ingreso, promedio) 
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id""",
-            (nombre, apellido, fake.email(), random.randint(18, 30), 
-             random.choice(universidades), random.choice(paises),
-             random.choice(carreras), random.randint(2018, 2024), 
-             round(random.uniform(6.0, 10.0), 2))
-        )
-        estudiante_id = cursor.fetchone()[0]
-        
-        # Matriculas para cada estudiante
-        num_cursos = random.randint(3, 8)
-        for j in range(num_cursos):
-            cursor.execute(
-                """INSERT INTO matriculas (estudiante_id, curso, semestre, nota, creditos)
-                   VALUES (%s, %s, %s, %s, %s)""",
-                (estudiante_id, random.choice(cursos), f"2024-{random.randint(1,2)}", 
-                 round(random.uniform(6.0, 10.0), 2), random.choice([3, 4, 5]))
-            )
-        
-        if (i + 1) % 100 == 0:
-            conn.commit()
-            print(f"  {i + 1} estudiantes insertados...")
+    def filas_estudiantes():
+        for estudiante_id in range(1, NUM_ESTUDIANTES + 1):
+            yield (estudiante_id, fake.first_name(), fake.last_name(), fake.email(), random.randint(18, 30),
+                   random.choice(universidades), random.choice(paises),
+                   random.choice(carreras), random.randint(2018, 2024),
+                   nota_decimal(random.uniform(6.0, 10.0)))
+    
+    # Matriculas para cada estudiante: segunda pasada sobre los ids con su propio generador
+    # sembrado, así se copian en streaming sin acumularlas en memoria
+    semilla_matriculas = random.getrandbits(64)
+    
+    def filas_matriculas():
+        rng = random.Random(semilla_matriculas)
+        matricula_id = 1
+        for estudiante_id in range(1, NUM_ESTUDIANTES + 1):
+            # Cursos sin repetir por estudiante, como en generate_data.py
+            for curso, creditos in rng.sample(cursos, rng.randint(*MATRICULAS_POR_ESTUDIANTE)):
+                yield (matricula_id, estudiante_id, curso,
+                       f"2024-{rng.randint(1,2)}", nota_decimal(rng.uniform(6.0, 10.0)),
+                       creditos)
+                matricula_id += 1
     
+    copiar_filas(cursor, 'estudiantes',
+                 ('id', 'nombre', 'apellido', 'email', 'edad', 'universidad_id',
+                  'pais_origen_id', 'carrera', 'año_ingreso', 'promedio'),
+                 filas_estudiantes())
+    copiar_filas(cursor, 'matriculas', ('id', 'estudiante_id', 'curso', 'semestre', 'nota', 'creditos'),
+                 filas_matriculas())
+    
+    for tabla in ('paises', 'universidades', 'estudiantes', 'matriculas'):
+        ajustar_secuencia(cursor, tabla)
     conn.commit()
     
     # Crear índices
     print("Creando índices...")
     cursor.execute("CREATE INDEX idx_estudiantes_nombre ON estudiantes(nombre, apellido);")
     cursor.execute("CREATE INDEX idx_matriculas_estudiante ON matriculas(estudiante_id);")
+    crear_indices_busqueda(cursor)
+    crear_resumen_estudiantes(cursor)
     conn.commit()
     
     cursor.execute("SELECT COUNT(*) FROM estudiantes")
@@ -233,7 +241,8 @@ def setup_mongodb():
                     'nota': float(m[2]),
                     'creditos': m[3]
                 } for m in matriculas
-            ]
+            ],
+            'nombre_completo': nombre_completo(est[1], est[2])
         }
         documentos.append(doc)
         
@@ -248,6 +257,7 @@ def setup_mongodb():
     print("Creando índices...")
     db.estudiantes.create_index([('nombre', 1), ('apellido', 1)])
     db.estudiantes.create_index('email')
+    crear_indice_nombre_completo(db.estudiantes)
     
     count = db.estudiantes.count_documents({})
     print(f"✓ {count} estudiantes en MongoDB")
@@ -258,13 +268,18 @@ def setup_mongodb():
     return True
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Configura las bases de datos con un dataset pequeño")
+    parser.add_argument('--escala', type=float, default=ESCALA_QUICK_SETUP,
+                        help="Factor de escala del dataset (0.04 = 1k estudiantes, ver escala.py)")
+    args = parser.parse_args()
+
     print("=" * 70)
     print("CONFIGURACIÓN RÁPIDA DE BASES DE DATOS")
     print("=" * 70)
     print()
     
     try:
-        setup_postgresql()
+        setup_postgresql(args.escala)
         setup_mongodb()
         
         print("\n" + "=" * 70)
@@ -3,8 +3,11 @@ Script mejorado para configurar bases de datos con mejor manejo de errores
 """
 import psycopg2
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import json
 import os
+import sys
+import time
 
 # Configuración PostgreSQL
 PG_CONFIG = {
@@ -22,7 +25,371 @@ MONGO_CONFIG = {
     'database': 'universidad_db'
 }
 
-def setup_postgresql():
+# Colación insensible a mayúsculas/minúsculas (respeta tildes) para nombre_completo
+NOMBRE_COLLATION = {'locale': 'es', 'strength': 2}
+
+def nombre_completo(nombre, apellido):
+    """Nombre completo normalizado que se guarda en los documentos de MongoDB"""
+    return f"{nombre} {apellido}".strip()
+
+def crear_indice_nombre_completo(collection):
+    """Crea el índice único e insensible a mayúsculas sobre nombre_completo.
+
+    Si la colección tiene nombres repetidos el índice único no se puede crear;
+    en ese caso se crea el mismo índice sin restricción de unicidad para que
+    las búsquedas sigan siendo por índice.
+    """
+    try:
+        collection.create_index([('nombre_completo', 1)], name='idx_nombre_completo',
+                                unique=True, collation=NOMBRE_COLLATION)
+        return True
+    except (DuplicateKeyError, OperationFailure) as e:
+        print(f"⚠ No se pudo crear el índice único de nombre_completo: {e}")
+        print("  Creando índice no único (hay nombres repetidos)...")
+        collection.create_index([('nombre_completo', 1)], name='idx_nombre_completo',
+                                collation=NOMBRE_COLLATION)
+        return False
+
+def migrar_nombre_completo():
+    """Agrega nombre_completo a una colección ya cargada sin recargar los documentos"""
+    print("Migrando MongoDB: campo nombre_completo...")
+
+    try:
+        client = MongoClient(MONGO_CONFIG['host'], MONGO_CONFIG['port'], serverSelectionTimeoutMS=5000)
+        client.server_info()
+        db = client[MONGO_CONFIG['database']]
+
+        # Actualización en el servidor con pipeline: no viaja ningún documento al cliente
+        result = db.estudiantes.update_many(
+            {'nombre_completo': {'$exists': False}},
+            [{'$set': {'nombre_completo': {'$trim': {'input': {'$concat': ['$nombre', ' ', '$apellido']}}}}}]
+        )
+        print(f"✓ {result.modified_count} documentos actualizados")
+
+        print("Creando índice...")
+        crear_indice_nombre_completo(db.estudiantes)
+        print("✓ Migración completada")
+
+        client.close()
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        print("  Asegúrate de que MongoDB esté corriendo")
+        return False
+
+def crear_indice_medido(cursor, nombre, sql):
+    """Crea un índice e informa su tiempo de construcción y su tamaño"""
+    start_time = time.time()
+    cursor.execute(sql)
+    elapsed_time = time.time() - start_time
+
+    cursor.execute("SELECT pg_size_pretty(pg_relation_size(%s::regclass))", (nombre,))
+    size = cursor.fetchone()[0]
+    print(f"  ✓ {nombre}: {elapsed_time:.2f}s, {size}")
+
+# Caracteres por lectura que COPY pide al origen de filas
+COPY_BUFFER = 64 * 1024
+
+# Escapes del formato de texto de COPY (la barra invertida primero)
+_ESCAPES_COPY = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+def valor_copy(valor):
+    """Representa un valor en el formato de texto de COPY (None es \\N)"""
+    if valor is None:
+        return '\\N'
+    return str(valor).translate(_ESCAPES_COPY)
+
+class FilasCopy:
+    """Archivo de solo lectura que entrega las filas de un iterador en formato COPY.
+
+    copy_expert llama a read(size) repetidamente; cada lectura convierte solo las
+    filas necesarias para llenar el búfer, así que el iterador puede ser un
+    generador y nunca se arma el volcado completo en memoria.
+    """
+
+    def __init__(self, filas):
+        self._filas = iter(filas)
+        self._resto = ''
+        self.cantidad = 0
+
+    def read(self, size=-1):
+        partes = [self._resto]
+        largo = len(self._resto)
+        if size < 0 or largo < size:
+            for fila in self._filas:
+                linea = '\t'.join(valor_copy(v) for v in fila) + '\n'
+                partes.append(linea)
+                largo += len(linea)
+                self.cantidad += 1
+                if 0 <= size <= largo:
+                    break
+
+        datos = ''.join(partes)
+        if 0 <= size < len(datos):
+            datos, self._resto = datos[:size], datos[size:]
+        else:
+            self._resto = ''
+        return datos
+
+def copiar_filas(cursor, tabla, columnas, filas):
+    """Carga filas con COPY FROM STDIN e informa las filas por segundo.
+
+    filas es cualquier iterable de tuplas en el orden de `columnas`. Devuelve la
+    cantidad de filas copiadas.
+    """
+    start_time = time.time()
+    origen = FilasCopy(filas)
+    cursor.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN", origen, size=COPY_BUFFER)
+    elapsed_time = time.time() - start_time
+
+    rate = origen.cantidad / elapsed_time if elapsed_time > 0 else 0
+    print(f"  ✓ {tabla}: {origen.cantidad:,} filas en {elapsed_time:.2f}s ({rate:,.0f} filas/s)")
+    return origen.cantidad
+
+# Archivos de datos NoSQL que escribe generate_data.py (--nosql ndjson o json)
+ARCHIVOS_NOSQL = ('data_nosql.ndjson', 'data_nosql.json')
+
+# Documentos por insert_many al cargar MongoDB
+MONGO_CHUNK_DOCUMENTOS = 1000
+
+# Caracteres por lectura al recorrer el arreglo de data_nosql.json
+JSON_BUFFER = 1024 * 1024
+
+def archivo_nosql():
+    """Archivo de datos NoSQL más reciente, o None si no hay ninguno"""
+    existentes = [ruta for ruta in ARCHIVOS_NOSQL if os.path.exists(ruta)]
+    return max(existentes, key=os.path.getmtime) if existentes else None
+
+def _documentos_arreglo_json(f):
+    """Recorre un arreglo JSON de documentos decodificando de a uno con raw_decode"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(JSON_BUFFER).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Se esperaba un arreglo JSON de documentos")
+    pos = 1
+    while True:
+        # Saltar espacios y separadores; pedir más texto si se acabó el búfer
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer):
+                break
+            buffer, pos = f.read(JSON_BUFFER), 0
+            if not buffer:
+                raise ValueError("Arreglo JSON sin cerrar")
+        if buffer[pos] == ']':
+            return
+
+        try:
+            doc, fin = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Documento cortado por el borde del búfer: agregar el siguiente trozo
+            mas = f.read(JSON_BUFFER)
+            if not mas:
+                raise
+            buffer, pos = buffer[pos:] + mas, 0
+            continue
+        yield doc
+        pos = fin
+
+def leer_documentos(ruta):
+    """Genera los documentos de data_nosql.ndjson o data_nosql.json sin cargar el archivo entero"""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        if ruta.endswith('.ndjson'):
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+        else:
+            yield from _documentos_arreglo_json(f)
+
+def ajustar_secuencia(cursor, tabla):
+    """Sincroniza la secuencia SERIAL de `tabla` tras cargar ids generados en el cliente"""
+    cursor.execute(f"""
+        SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL)
+        FROM {tabla};
+    """)
+
+def crear_indices_busqueda(cursor, trigramas=True):
+    """Crea los índices que usan los modos de búsqueda de la app en PostgreSQL"""
+    # Índice de expresión para la búsqueda exacta por nombre completo (sin distinguir mayúsculas).
+    # Usa || en lugar de CONCAT porque CONCAT no es IMMUTABLE y no se puede indexar.
+    crear_indice_medido(cursor, 'idx_estudiantes_nombre_completo', """
+        CREATE INDEX IF NOT EXISTS idx_estudiantes_nombre_completo
+        ON estudiantes (LOWER(nombre || ' ' || apellido));
+    """)
+
+    if not trigramas:
+        return
+
+    # Índice GIN de trigramas para búsquedas por subcadena (ILIKE '%...%').
+    # pg_trgm es opcional: si la extensión no se puede crear se omite el índice.
+    cursor.execute("SAVEPOINT pg_trgm;")
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    except psycopg2.Error as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT pg_trgm;")
+        print(f"  ⚠ pg_trgm no disponible, se omite el índice de trigramas: {e}")
+        return
+    cursor.execute("RELEASE SAVEPOINT pg_trgm;")
+
+    crear_indice_medido(cursor, 'idx_estudiantes_nombre_trgm', """
+        CREATE INDEX IF NOT EXISTS idx_estudiantes_nombre_trgm
+        ON estudiantes USING GIN ((nombre || ' ' || apellido) gin_trgm_ops);
+    """)
+
+def crear_resumen_estudiantes(cursor):
+    """Crea el resumen precalculado por estudiante y los triggers que lo mantienen.
+
+    resumen_estudiantes guarda los datos del estudiante con su universidad y países
+    ya resueltos, más los agregados de matrículas (cantidad, suma de notas y
+    créditos). Los triggers lo actualizan de forma incremental cuando cambian las
+    matrículas o los estudiantes, así que debe crearse después de la carga masiva.
+    """
+    print("Creando resumen precalculado de estudiantes...")
+    start_time = time.time()
+
+    cursor.execute("""
+        DROP TABLE IF EXISTS resumen_estudiantes CASCADE;
+
+        CREATE TABLE resumen_estudiantes (
+            id INTEGER PRIMARY KEY REFERENCES estudiantes(id) ON DELETE CASCADE,
+            nombre VARCHAR(100) NOT NULL,
+            apellido VARCHAR(100) NOT NULL,
+            email VARCHAR(200) NOT NULL,
+            edad INTEGER NOT NULL,
+            carrera VARCHAR(100) NOT NULL,
+            año_ingreso INTEGER NOT NULL,
+            promedio DECIMAL(3,2) NOT NULL,
+            universidad VARCHAR(200),
+            ciudad_universidad VARCHAR(100),
+            pais_universidad VARCHAR(100),
+            pais_origen VARCHAR(100),
+            codigo_pais VARCHAR(10),
+            total_cursos INTEGER NOT NULL DEFAULT 0,
+            suma_notas DECIMAL(12,2) NOT NULL DEFAULT 0,
+            total_creditos INTEGER NOT NULL DEFAULT 0
+        );
+
+        INSERT INTO resumen_estudiantes
+        SELECT
+            e.id, e.nombre, e.apellido, e.email, e.edad, e.carrera, e.año_ingreso, e.promedio,
+            u.nombre, u.ciudad, p_uni.nombre, p_ori.nombre, p_ori.codigo,
+            COUNT(m.id), COALESCE(SUM(m.nota), 0), COALESCE(SUM(m.creditos), 0)
+        FROM estudiantes e
+        JOIN universidades u ON e.universidad_id = u.id
+        JOIN paises p_uni ON u.pais_id = p_uni.id
+        JOIN paises p_ori ON e.pais_origen_id = p_ori.id
+        LEFT JOIN matriculas m ON e.id = m.estudiante_id
+        GROUP BY e.id, u.nombre, u.ciudad, p_uni.nombre, p_ori.nombre, p_ori.codigo;
+
+        CREATE INDEX idx_resumen_nombre_completo
+        ON resumen_estudiantes (LOWER(nombre || ' ' || apellido));
+    """)
+
+    # Mismo índice de trigramas que en estudiantes si pg_trgm está instalada
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if cursor.fetchone():
+        cursor.execute("""
+            CREATE INDEX idx_resumen_nombre_trgm
+            ON resumen_estudiantes USING GIN ((nombre || ' ' || apellido) gin_trgm_ops);
+        """)
+
+    # Mantenimiento incremental: cada matrícula suma o resta sus valores en el resumen
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION actualizar_resumen_matriculas() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE resumen_estudiantes
+                SET total_cursos = total_cursos - 1,
+                    suma_notas = suma_notas - OLD.nota,
+                    total_creditos = total_creditos - OLD.creditos
+                WHERE id = OLD.estudiante_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE resumen_estudiantes
+                SET total_cursos = total_cursos + 1,
+                    suma_notas = suma_notas + NEW.nota,
+                    total_creditos = total_creditos + NEW.creditos
+                WHERE id = NEW.estudiante_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_resumen_matriculas ON matriculas;
+        CREATE TRIGGER trg_resumen_matriculas
+        AFTER INSERT OR UPDATE OR DELETE ON matriculas
+        FOR EACH ROW EXECUTE FUNCTION actualizar_resumen_matriculas();
+    """)
+
+    # Altas y cambios de estudiantes: vuelve a resolver universidad y países sin tocar los agregados
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION actualizar_resumen_estudiantes() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO resumen_estudiantes
+                (id, nombre, apellido, email, edad, carrera, año_ingreso, promedio,
+                 universidad, ciudad_universidad, pais_universidad, pais_origen, codigo_pais)
+            SELECT NEW.id, NEW.nombre, NEW.apellido, NEW.email, NEW.edad, NEW.carrera,
+                   NEW.año_ingreso, NEW.promedio, u.nombre, u.ciudad, p_uni.nombre,
+                   p_ori.nombre, p_ori.codigo
+            FROM universidades u
+            JOIN paises p_uni ON u.pais_id = p_uni.id
+            JOIN paises p_ori ON p_ori.id = NEW.pais_origen_id
+            WHERE u.id = NEW.universidad_id
+            ON CONFLICT (id) DO UPDATE SET
+                nombre = EXCLUDED.nombre,
+                apellido = EXCLUDED.apellido,
+                email = EXCLUDED.email,
+                edad = EXCLUDED.edad,
+                carrera = EXCLUDED.carrera,
+                año_ingreso = EXCLUDED.año_ingreso,
+                promedio = EXCLUDED.promedio,
+                universidad = EXCLUDED.universidad,
+                ciudad_universidad = EXCLUDED.ciudad_universidad,
+                pais_universidad = EXCLUDED.pais_universidad,
+                pais_origen = EXCLUDED.pais_origen,
+                codigo_pais = EXCLUDED.codigo_pais;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_resumen_estudiantes ON estudiantes;
+        CREATE TRIGGER trg_resumen_estudiantes
+        AFTER INSERT OR UPDATE ON estudiantes
+        FOR EACH ROW EXECUTE FUNCTION actualizar_resumen_estudiantes();
+    """)
+
+    cursor.execute("ANALYZE resumen_estudiantes;")
+    cursor.execute("SELECT pg_size_pretty(pg_total_relation_size('resumen_estudiantes'))")
+    size = cursor.fetchone()[0]
+    print(f"  ✓ resumen_estudiantes: {time.time() - start_time:.2f}s, {size}")
+
+def actualizar_indices_postgres(trigramas=True):
+    """Agrega los índices de búsqueda y el resumen precalculado a una base ya cargada sin recargar los datos"""
+    print("Actualizando índices de PostgreSQL...")
+
+    try:
+        pg_config = PG_CONFIG.copy()
+        pg_config['database'] = 'universidad_db'
+        conn = psycopg2.connect(**pg_config)
+        cursor = conn.cursor()
+
+        crear_indices_busqueda(cursor, trigramas)
+        crear_resumen_estudiantes(cursor)
+        cursor.execute("ANALYZE estudiantes;")
+        conn.commit()
+        print("✓ Índices actualizados")
+
+        cursor.close()
+        conn.close()
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return False
+
+def setup_postgresql(trigramas=True):
     """Configura PostgreSQL usando psycopg2 directamente"""
     print("Configurando PostgreSQL...")
 
@@ -46,10 +413,9 @@ def setup_postgresql():
         conn.autocommit = False
         cursor = conn.cursor()
 
-        # Cargar datos JSON
-        print("Cargando datos desde JSON...")
-        with open('data_nosql.json', 'r', encoding='utf-8') as f:
-            students_data = json.load(f)
+        # Los documentos se leen en streaming: una pasada por tabla en vez de cargar el archivo entero
+        ruta = archivo_nosql()
+        print(f"Leyendo datos desde {ruta}...")
 
         # Crear tablas
         print("Creando tablas...")
@@ -111,7 +477,7 @@ def setup_postgresql():
         paises_dict = {}
         universidades_dict = {}
 
-        for student in students_data:
+        for student in leer_documentos(ruta):
             pais_origen = student['pais_origen']
             pais_uni = student['universidad']['pais']
             universidad = student['universidad']
@@ -126,64 +492,46 @@ def setup_postgresql():
             if universidad['id'] not in universidades_dict:
                 universidades_dict[universidad['id']] = universidad
 
-        # Insertar países
-        print(f"Insertando {len(paises_dict)} países...")
-        for pais in paises_dict.values():
-            cursor.execute(
-                "INSERT INTO paises (id, nombre, codigo) VALUES (%s, %s, %s)",
-                (pais['id'], pais['nombre'], pais['codigo'])
-            )
-        conn.commit()
-
-        # Insertar universidades
-        print(f"Insertando {len(universidades_dict)} universidades...")
-        for uni in universidades_dict.values():
-            cursor.execute(
-                "INSERT INTO universidades (id, nombre, pais_id, ciudad) VALUES (%s, %s, %s, %s)",
-                (uni['id'], uni['nombre'], uni['pais']['id'], uni['ciudad'])
-            )
-        conn.commit()
-
-        # Insertar estudiantes
-        print(f"Insertando {len(students_data)} estudiantes...")
-        for student in students_data:
-            cursor.execute(
-                """INSERT INTO estudiantes (id, nombre, apellido, email, edad, universidad_id, 
-                   pais_origen_id, carrera, año_ingreso, promedio) 
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
-                (student['id'], student['nombre'], student['apellido'], student['email'],
-                 student['edad'], student['universidad']['id'], student['pais_origen']['id'],
-                 student['carrera'], student['año_ingreso'], student['promedio'])
-            )
-
-        if len(students_data) % 1000 == 0:
-            conn.commit()
-
-        conn.commit()
-
-        # Insertar matrículas
-        print("Insertando matrículas...")
-        matricula_id = 1
-        for student in students_data:
-            for matricula in student['matriculas']:
-                cursor.execute(
-                    """INSERT INTO matriculas (id, estudiante_id, curso, semestre, nota, creditos)
-                       VALUES (%s, %s, %s, %s, %s, %s)""",
-                    (matricula_id, student['id'], matricula['curso'], matricula['semestre'],
-                     matricula['nota'], matricula['creditos'])
-                )
-                matricula_id += 1
-
-                if matricula_id % 5000 == 0:
-                    conn.commit()
-                    print(f"  {matricula_id} matrículas insertadas...")
-
+        # Carga masiva con COPY: los ids vienen del JSON o se generan aquí
+        print("Copiando datos...")
+        copiar_filas(cursor, 'paises', ('id', 'nombre', 'codigo'),
+                     ((pais['id'], pais['nombre'], pais['codigo']) for pais in paises_dict.values()))
+
+        copiar_filas(cursor, 'universidades', ('id', 'nombre', 'pais_id', 'ciudad'),
+                     ((uni['id'], uni['nombre'], uni['pais']['id'], uni['ciudad'])
+                      for uni in universidades_dict.values()))
+
+        copiar_filas(cursor, 'estudiantes',
+                     ('id', 'nombre', 'apellido', 'email', 'edad', 'universidad_id',
+                      'pais_origen_id', 'carrera', 'año_ingreso', 'promedio'),
+                     ((student['id'], student['nombre'], student['apellido'], student['email'],
+                       student['edad'], student['universidad']['id'], student['pais_origen']['id'],
+                       student['carrera'], student['año_ingreso'], student['promedio'])
+                      for student in leer_documentos(ruta)))
+
+        def filas_matriculas():
+            # Ids generados en el cliente; generate_data.py guarda el nombre del curso en curso_nombre
+            matricula_id = 0
+            for student in leer_documentos(ruta):
+                for matricula in student['matriculas']:
+                    matricula_id += 1
+                    yield (matricula_id, student['id'], matricula.get('curso_nombre', matricula.get('curso')),
+                           matricula['semestre'], matricula['nota'], matricula['creditos'])
+
+        copiar_filas(cursor, 'matriculas',
+                     ('id', 'estudiante_id', 'curso', 'semestre', 'nota', 'creditos'),
+                     filas_matriculas())
+
+        for tabla in ('paises', 'universidades', 'estudiantes', 'matriculas'):
+            ajustar_secuencia(cursor, tabla)
         conn.commit()
 
         # Crear índices
         print("Creando índices...")
         cursor.execute("CREATE INDEX idx_estudiantes_nombre ON estudiantes(nombre, apellido);")
         cursor.execute("CREATE INDEX idx_matriculas_estudiante ON matriculas(estudiante_id);")
+        crear_indices_busqueda(cursor, trigramas)
+        crear_resumen_estudiantes(cursor)
         conn.commit()
 
         # Verificar
@@ -199,6 +547,38 @@ def setup_postgresql():
         print(f"✗ Error: {e}")
         return False
 
+def insertar_en_bloques(collection, documentos, tamano=MONGO_CHUNK_DOCUMENTOS):
+    """Inserta documentos en bloques con insert_many(ordered=False) informando el progreso.
+
+    Solo hay un bloque en memoria a la vez. Las escrituras no ordenadas dejan que
+    el servidor aplique el bloque sin detenerse en el primer error. Devuelve la
+    cantidad de documentos insertados.
+    """
+    start_time = time.time()
+    total = 0
+    lote = []
+
+    def insertar():
+        nonlocal total
+        collection.insert_many(lote, ordered=False)
+        total += len(lote)
+        elapsed = time.time() - start_time
+        print(f"  {total:,} documentos ({total / elapsed:,.0f} docs/s)...")
+        lote.clear()
+
+    for doc in documentos:
+        doc['nombre_completo'] = nombre_completo(doc['nombre'], doc['apellido'])
+        lote.append(doc)
+        if len(lote) >= tamano:
+            insertar()
+    if lote:
+        insertar()
+
+    elapsed = time.time() - start_time
+    rate = total / elapsed if elapsed > 0 else 0
+    print(f"  ✓ {total:,} documentos en {elapsed:.2f}s ({rate:,.0f} docs/s)")
+    return total
+
 def setup_mongodb():
     """Configura MongoDB"""
     print("\nConfigurando MongoDB...")
@@ -211,15 +591,14 @@ def setup_mongodb():
         db = client[MONGO_CONFIG['database']]
         db.estudiantes.drop()
 
-        with open('data_nosql.json', 'r', encoding='utf-8') as f:
-            students = json.load(f)
-
-        print(f"Insertando {len(students)} documentos...")
-        db.estudiantes.insert_many(students)
+        ruta = archivo_nosql()
+        print(f"Insertando documentos desde {ruta} (bloques de {MONGO_CHUNK_DOCUMENTOS:,})...")
+        insertar_en_bloques(db.estudiantes, leer_documentos(ruta))
 
         print("Creando índices...")
         db.estudiantes.create_index([("nombre", 1), ("apellido", 1)])
         db.estudiantes.create_index([("email", 1)])
+        crear_indice_nombre_completo(db.estudiantes)
 
         count = db.estudiantes.count_documents({})
         print(f"✓ {count} estudiantes cargados en MongoDB")
@@ -238,12 +617,25 @@ def main():
     print("="*60)
     print()
 
-    if not os.path.exists('data_nosql.json'):
-        print("✗ Archivo data_nosql.json no encontrado")
+    # Los índices de trigramas (pg_trgm) son opcionales: --sin-trigramas los omite
+    trigramas = '--sin-trigramas' not in sys.argv[1:]
+
+    # Migración de colecciones ya cargadas: python setup_databases_fixed.py --migrar-mongo
+    if '--migrar-mongo' in sys.argv[1:]:
+        migrar_nombre_completo()
+        return
+
+    # Índices de búsqueda sobre una base ya cargada: python setup_databases_fixed.py --indices-postgres
+    if '--indices-postgres' in sys.argv[1:]:
+        actualizar_indices_postgres(trigramas)
+        return
+
+    if archivo_nosql() is None:
+        print(f"✗ Archivo de datos no encontrado ({' / '.join(ARCHIVOS_NOSQL)})")
         print("  Ejecuta primero: python generate_data.py")
         return
 
-    pg_ok = setup_postgresql()
+    pg_ok = setup_postgresql(trigramas)
     mongo_ok = setup_mongodb()
 
     print()
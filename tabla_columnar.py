@@ -0,0 +1,91 @@
+"""
+Tabla en memoria guardada por columnas (arrays tipados y textos internados)
+Reemplaza las listas de diccionarios del generador: una fila no es un objeto
+"""
+import sys
+from array import array
+
+# Tipo de las columnas de texto: se guardan como códigos sobre un diccionario de valores
+TEXTO = 'texto'
+
+
+class TablaColumnar:
+    """Filas guardadas como una columna por campo.
+
+    `esquema` es una lista de (nombre, tipo) donde tipo es un código de
+    array.array ('q', 'i', 'h', 'b', 'd'...) o TEXTO. Los números ocupan lo que su
+    tipo en C (8 bytes un 'q' o un 'd', 1 un 'b') en vez de un objeto de Python
+    por valor, y cada texto distinto se guarda una sola vez (internado con
+    sys.intern) y la columna solo tiene su código de 4 bytes.
+
+    `derivadas` define columnas que no se guardan y se calculan al leer:
+    nombre -> (función, columnas de entrada). La conversión a filas o
+    diccionarios ocurre solo al recorrer la tabla para escribirla.
+    """
+
+    def __init__(self, esquema, derivadas=None):
+        self.tipos = dict(esquema)
+        self.derivadas = derivadas or {}
+        self.columnas = {nombre: array('I' if tipo == TEXTO else tipo) for nombre, tipo in esquema}
+        # Por columna de texto: (valores distintos, valor -> código)
+        self._textos = {nombre: ([], {}) for nombre, tipo in esquema if tipo == TEXTO}
+
+    def __len__(self):
+        return len(next(iter(self.columnas.values())))
+
+    def _codigo(self, nombre, valor):
+        valores, codigos = self._textos[nombre]
+        codigo = codigos.get(valor)
+        if codigo is None:
+            codigo = codigos[valor] = len(valores)
+            valores.append(sys.intern(valor))
+        return codigo
+
+    def agregar(self, fila):
+        """Agrega una fila dada como diccionario (el diccionario no se guarda)"""
+        for nombre, columna in self.columnas.items():
+            valor = fila[nombre]
+            columna.append(self._codigo(nombre, valor) if nombre in self._textos else valor)
+
+    def extender(self, nombre, valores):
+        """Agrega valores al final de una columna.
+
+        Para columnas numéricas `valores` puede ser un arreglo de NumPy: se copia
+        en bloque con el mismo tipo de C que el array.
+        """
+        columna = self.columnas[nombre]
+        if nombre in self._textos:
+            columna.extend(self._codigo(nombre, valor) for valor in valores)
+        elif hasattr(valores, 'astype'):
+            columna.frombytes(valores.astype(columna.typecode).tobytes())
+        else:
+            columna.extend(valores)
+
+    def valor(self, nombre, i):
+        """Valor de la fila i en una columna guardada"""
+        valor = self.columnas[nombre][i]
+        return self._textos[nombre][0][valor] if nombre in self._textos else valor
+
+    def cambiar(self, nombre, i, valor):
+        """Reemplaza el valor de la fila i en una columna guardada"""
+        self.columnas[nombre][i] = self._codigo(nombre, valor) if nombre in self._textos else valor
+
+    def valores(self, nombre):
+        """Lista con los valores de una columna (guardada o derivada)"""
+        if nombre in self.derivadas:
+            funcion, entradas = self.derivadas[nombre]
+            return [funcion(*fila) for fila in zip(*(self.valores(e) for e in entradas))]
+        columna = self.columnas[nombre]
+        if nombre in self._textos:
+            textos = self._textos[nombre][0]
+            return [textos[codigo] for codigo in columna]
+        return columna.tolist()
+
+    def filas(self, nombres):
+        """Tuplas con las columnas pedidas, en orden de fila"""
+        return zip(*(self.valores(nombre) for nombre in nombres))
+
+    def registros(self, nombres):
+        """Diccionarios con las columnas pedidas (se crean al recorrer, uno por fila)"""
+        for fila in self.filas(nombres):
+            yield dict(zip(nombres, fila))